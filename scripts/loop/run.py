@@ -8,27 +8,130 @@ Executes exactly ONE iteration:
 3. Enforce tests-first
 4. Run verification
 5. Update status and save
+
+With --schedule, runs every reachable pending story instead: the dependency
+DAG is built once, ready stories are taken from a priority queue, and their
+verification commands run concurrently on --jobs workers. A completed story
+unlocks its dependents. Like a single iteration, a run makes one attempt per
+story: a failed one stays pending with its retries incremented, to be retried
+by a later run, and is marked failed once it reaches max_retries.
+
+  python scripts/loop/run.py --schedule --jobs 4
+
+Story transitions are appended to prd.journal.jsonl (one fsynced line each)
+instead of rewriting prd.json. load_prd() replays the journal, so a crashed
+run resumes where it stopped; prd.json is rewritten atomically once at the
+end of a run (or with --materialize) and the journal is then removed.
+
+Stories that declare `inputs` (files, directories or glob patterns the
+verification reads) reuse a cached pass when the command, the test_file and
+every input are byte-identical to a previous passing run. The cache entry
+keeps that run's output and duration; --no-verify-cache disables it.
+
+Verification output is streamed to .ahs-cache/loop/logs/<story>.<attempt>.log;
+only its head and tail are kept in memory and written to progress.txt. A
+command running longer than the story's `timeout_seconds` (default: the
+`verification_timeout_seconds` rule) is killed with its whole process group.
 """
 
+import argparse
+import hashlib
+import heapq
 import json
+import os
+import signal
 import subprocess
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
+LOOP_DIR = Path(__file__).parent
+PRD_PATH = LOOP_DIR / "prd.json"
+JOURNAL_PATH = LOOP_DIR / "prd.journal.jsonl"
+PROGRESS_PATH = LOOP_DIR / "progress.txt"
+VERIFY_CACHE_DIR = LOOP_DIR.parents[1] / ".ahs-cache" / "loop"
+LOG_DIR = LOOP_DIR.parents[1] / ".ahs-cache" / "loop" / "logs"
+HEAD_BYTES = TAIL_BYTES = 4096
+KILL_GRACE_SECONDS = 5
+
+class StateJournal:
+    """Append-only log of story field changes, replayed over prd.json on load."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def replay(self, prd):
+        """Apply journaled changes to prd; a torn final line from a crash is cut off."""
+        if not self.path.exists():
+            return 0
+        by_id = {s["id"]: s for s in prd["stories"]}
+        applied = good_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                changes = dict(entry)
+                story = by_id.get(changes.pop("id", None))
+                if story is not None:
+                    story.update(changes)
+                    applied += 1
+                good_bytes += len(line)
+        if good_bytes < self.path.stat().st_size:
+            os.truncate(self.path, good_bytes)
+        return applied
+
+    def record(self, story, **changes):
+        """Apply changes to story and append them durably."""
+        story.update(changes)
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding="utf-8")
+        self._file.write(json.dumps({"id": story["id"], **changes}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def clear(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.path.unlink(missing_ok=True)
+
+JOURNAL = StateJournal(JOURNAL_PATH)
+_progress = None
+
 def load_prd():
-    prd_path = Path(__file__).parent / "prd.json"
-    with open(prd_path, 'r') as f:
-        return json.load(f)
+    with open(PRD_PATH, 'r') as f:
+        prd = json.load(f)
+    JOURNAL.replay(prd)
+    return prd
+
+def update_story(story, **changes):
+    """Record a story transition (status, retries) in the journal."""
+    JOURNAL.record(story, **changes)
 
 def save_prd(prd):
-    prd_path = Path(__file__).parent / "prd.json"
-    with open(prd_path, 'w') as f:
+    """Materialize prd.json atomically, then drop the journal it now contains."""
+    tmp = PRD_PATH.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
         json.dump(prd, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, PRD_PATH)
+    JOURNAL.clear()
 
 def log_progress(message):
-    progress_path = Path(__file__).parent / "progress.txt"
-    with open(progress_path, 'a') as f:
-        f.write(message + "\n")
+    global _progress
+    if _progress is None:
+        _progress = open(PROGRESS_PATH, 'a')
+    _progress.write(message + "\n")
+    _progress.flush()
 
 def find_eligible_story(prd):
     pending_stories = [s for s in prd["stories"] if s["status"] == "pending"]
@@ -42,15 +145,292 @@ def find_eligible_story(prd):
 
     return None
 
-def run_verification(command):
+class OutputTail:
+    """Keeps the first HEAD_BYTES and last TAIL_BYTES of a stream, copying all of it to a log file."""
+
+    def __init__(self, log):
+        self.log = log
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def feed(self, chunk):
+        if self.log is not None:
+            self.log.write(chunk)
+        self.total += len(chunk)
+        room = HEAD_BYTES - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        self.tail += chunk
+        del self.tail[:-TAIL_BYTES]
+
+    def pump(self, fd):
+        while True:
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                break
+            self.feed(chunk)
+
+    def text(self, log_path=None):
+        omitted = self.total - len(self.head) - len(self.tail)
+        if omitted <= 0:
+            return (bytes(self.head) + bytes(self.tail)).decode("utf-8", "replace")
+        where = f", full output in {log_path}" if log_path else ""
+        return (self.head.decode("utf-8", "replace") + f"\n[... {omitted} bytes omitted{where} ...]\n"
+                + self.tail.decode("utf-8", "replace"))
+
+def drain(captured, stream, log):
+    """Reader thread body: pump the pipe into captured, then close the pipe and the log it owns."""
+    try:
+        captured.pump(stream.fileno())
+    finally:
+        stream.close()
+        if log is not None:
+            log.close()
+
+def run_verification(command, log_path=None, timeout=None):
+    """
+    Run command in its own session, streaming output to log_path. Returns
+    (success, output) with output bounded to its head and tail; on timeout
+    the whole process group is terminated.
+    """
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        return result.returncode == 0, result.stdout + result.stderr
+        log = None
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            log = open(log_path, 'wb')
+        try:
+            proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    start_new_session=True)
+        except BaseException:
+            if log is not None:
+                log.close()
+            raise
+        captured = OutputTail(log)
+        # The reader closes the pipe and the log itself: a grandchild that escaped the
+        # process group can keep the pipe open past the grace period below.
+        reader = threading.Thread(target=drain, args=(captured, proc.stdout, log), daemon=True)
+        reader.start()
+        timed_out = False
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            kill_group(proc)
+        reader.join(KILL_GRACE_SECONDS)
+        output = captured.text(log_path)
+        if timed_out:
+            return False, f"timed out after {timeout}s\n{output}"
+        return proc.returncode == 0, output
     except Exception as e:
         return False, str(e)
 
+def kill_group(proc):
+    """SIGTERM the command's process group, then SIGKILL whatever survives the grace period."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            proc.wait(timeout=KILL_GRACE_SECONDS)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+def story_timeout(prd, story):
+    """Per-story wall-clock limit in seconds, or None for no limit."""
+    return story.get("timeout_seconds", prd.get("rules", {}).get("verification_timeout_seconds"))
+
+def story_log_path(story):
+    return LOG_DIR / f"{story['id']}.{story.get('retries', 0) + 1}.log"
+
+def input_files(patterns):
+    """Sorted files named by a story's `inputs`: paths, directories (recursive) or globs."""
+    files = set()
+    for pattern in patterns:
+        p = Path(pattern)
+        matches = Path().glob(pattern) if any(c in pattern for c in "*?[") else [p]
+        for m in matches:
+            if m.is_dir():
+                files.update(f for f in m.rglob("*") if f.is_file())
+            else:
+                files.add(m)
+    return sorted(files)
+
+def verification_key(story):
+    """Cache key over command, test_file and declared inputs; None if the story declares no inputs."""
+    if not story.get("inputs"):
+        return None
+    h = hashlib.sha256(story["verification"].encode("utf-8"))
+    named = [Path(story["test_file"])] if story.get("test_file") else []
+    for f in named + input_files(story["inputs"]):
+        h.update(b"\0" + str(f).encode("utf-8") + b"\0")
+        try:
+            h.update(hashlib.sha256(f.read_bytes()).digest())
+        except OSError:
+            h.update(b"missing")
+    return h.hexdigest()
+
+def cached_verification(story, timeout=None):
+    """Run the story's verification, reusing a cached pass; returns (success, output, entry)."""
+    key = verification_key(story) if VERIFY_CACHE_DIR is not None else None
+    entry_path = VERIFY_CACHE_DIR / f"{key}.json" if key else None
+    if entry_path is not None and entry_path.exists():
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+            return True, entry["output"], entry
+        except (OSError, ValueError, KeyError):
+            pass
+
+    started = time.perf_counter()
+    log_path = story_log_path(story)
+    success, output = run_verification(story["verification"], log_path, timeout)
+    if success and entry_path is not None:
+        entry = {
+            "story": story["id"],
+            "command": story["verification"],
+            "test_file": story.get("test_file"),
+            "inputs": story["inputs"],
+            "output": output,
+            "log": str(log_path),
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "recorded_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = entry_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(entry, indent=2), encoding="utf-8")
+            os.replace(tmp, entry_path)
+        except OSError:
+            pass  # a cache write failure never fails the story
+    return success, output, None
+
+def cache_note(entry):
+    if entry is None:
+        return ""
+    return f" (cached pass from {entry['recorded_utc']}, originally {entry['duration_seconds']}s)"
+
+def verify_story(story, timeout=None):
+    """
+    Tests-first check, then the story's verification; returns (success, note),
+    where note is the failure log on failure and the cache note on success.
+    """
+    test_file = story.get("test_file")
+    if test_file and not Path(test_file).exists():
+        return False, f" - test_file {test_file} does not exist"
+    success, output, entry = cached_verification(story, timeout)
+    if not success:
+        return False, f" verification failed\nOutput: {output}"
+    return True, cache_note(entry)
+
+def build_dag(prd):
+    """
+    Index pending stories once: returns (waiting, dependents), where waiting maps
+    story id -> number of unfinished dependencies and dependents maps id -> ids
+    that depend on it. Stories whose dependencies can never complete are left out.
+    """
+    by_id = {s["id"]: s for s in prd["stories"]}
+    pending = {s["id"] for s in prd["stories"] if s["status"] == "pending"}
+    waiting, dependents = {}, {}
+    for story_id in pending:
+        deps = by_id[story_id].get("dependencies", [])
+        if any(dep not in by_id or by_id[dep]["status"] == "failed" for dep in deps):
+            continue
+        waiting[story_id] = sum(1 for dep in deps if dep in pending)
+        for dep in deps:
+            if dep in pending:
+                dependents.setdefault(dep, []).append(story_id)
+    return waiting, dependents
+
+def schedule(prd, jobs):
+    """Run all reachable pending stories, at most `jobs` verifications at a time."""
+    by_id = {s["id"]: s for s in prd["stories"]}
+    order = {s["id"]: i for i, s in enumerate(prd["stories"])}
+    max_retries = prd.get("rules", {}).get("max_retries", 0)
+    waiting, dependents = build_dag(prd)
+
+    ready = []
+    def push(story_id):
+        heapq.heappush(ready, (by_id[story_id]["priority"], order[story_id], story_id))
+
+    for story_id, count in waiting.items():
+        if count == 0:
+            push(story_id)
+
+    completed, failed, retry = [], [], []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while ready or running:
+            while ready and len(running) < jobs:
+                story = by_id[heapq.heappop(ready)[2]]
+                if story.get("retries", 0) >= max_retries:
+                    log_progress(f"STOP: Story {story['id']} exceeded max_retries ({max_retries})")
+                    update_story(story, status="failed")
+                    failed.append(story["id"])
+                    continue
+                running[pool.submit(verify_story, story, story_timeout(prd, story))] = story
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                story = running.pop(future)
+                success, note = future.result()
+                if not success:
+                    # One attempt per run: retrying now, with nothing changed, would only burn retries.
+                    update_story(story, retries=story.get("retries", 0) + 1)
+                    log_progress(f"FAIL: Story {story['id']}{note}")
+                    print(f"Story {story['id']} failed (attempt {story['retries']}/{max_retries})")
+                    retry.append(story["id"])
+                    continue
+                update_story(story, status="completed")
+                log_progress(f"COMPLETE: Story {story['id']} - {story['title']}{note}")
+                print(f"Story {story['id']} completed successfully{note}")
+                completed.append(story["id"])
+                for dependent in dependents.get(story["id"], []):
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        push(dependent)
+
+    blocked = [s["id"] for s in prd["stories"] if s["status"] == "pending" and s["id"] not in retry]
+    if not completed and not failed and not retry:
+        log_progress("STOP: No eligible pending story found")
+    print(f"Scheduled run: {len(completed)} completed, {len(retry)} to retry, {len(failed)} failed, "
+          f"{len(blocked)} still pending")
+    return 0 if completed and not failed and not retry else 1
+
 def main():
+    ap = argparse.ArgumentParser(description="Run the project loop.")
+    ap.add_argument("--schedule", action="store_true",
+                    help="run every reachable pending story instead of exactly one")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                    help="concurrent verifications in --schedule mode (default: CPU count)")
+    ap.add_argument("--materialize", action="store_true",
+                    help="replay the state journal into prd.json and exit")
+    ap.add_argument("--no-verify-cache", action="store_true",
+                    help="always run verification commands, ignoring cached passes")
+    args = ap.parse_args()
+
+    global VERIFY_CACHE_DIR
+    if args.no_verify_cache:
+        VERIFY_CACHE_DIR = None
+
     prd = load_prd()
+    if args.materialize:
+        if JOURNAL.path.exists():
+            save_prd(prd)
+        return 0
+    if args.schedule:
+        try:
+            return schedule(prd, max(1, args.jobs))
+        finally:
+            if JOURNAL.path.exists():
+                save_prd(prd)
+    # A single iteration only appends to the journal; the next run replays it.
+    return run_once(prd)
+
+def run_once(prd):
+    """One iteration: the highest-priority eligible story."""
     story = find_eligible_story(prd)
 
     if not story:
@@ -62,32 +442,28 @@ def main():
     current_retries = story.get("retries", 0)
     if current_retries >= max_retries:
         log_progress(f"STOP: Story {story['id']} exceeded max_retries ({max_retries})")
-        story["status"] = "failed"
-        save_prd(prd)
+        update_story(story, status="failed")
         return 1
 
     test_file = story.get("test_file")
     if test_file and not Path(test_file).exists():
-        story["retries"] = current_retries + 1
+        update_story(story, retries=current_retries + 1)
         log_progress(f"FAIL: Story {story['id']} - test_file {test_file} does not exist")
-        save_prd(prd)
         print(f"Test file missing: {test_file}")
         return 1
 
     command = story["verification"]
-    success, output = run_verification(command)
+    success, output, entry = cached_verification(story, story_timeout(prd, story))
 
     if not success:
-        story["retries"] = current_retries + 1
+        update_story(story, retries=current_retries + 1)
         log_progress(f"FAIL: Story {story['id']} verification failed\nOutput: {output}")
-        save_prd(prd)
         print(f"Verification failed: {command}")
         return 1
 
-    story["status"] = "completed"
-    log_progress(f"COMPLETE: Story {story['id']} - {story['title']}")
-    save_prd(prd)
-    print(f"Story {story['id']} completed successfully")
+    update_story(story, status="completed")
+    log_progress(f"COMPLETE: Story {story['id']} - {story['title']}{cache_note(entry)}")
+    print(f"Story {story['id']} completed successfully{cache_note(entry)}")
     return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Validator startup benchmark
+
+Measures the cold wall time of `python tools/validate.py <record>` (a fresh
+interpreter per run, as agents invoke it), with the result cache disabled
+and with a warm cache, and optionally fails when the median exceeds a budget.
+
+Usage:
+  python3 tools/bench-startup.py
+  python3 tools/bench-startup.py --runs 30 --max-ms 250
+  python3 tools/bench-startup.py --imports      # heaviest imports of one cold run
+  python3 tools/bench-startup.py --json > startup.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+VALIDATOR = ROOT / "tools" / "validate.py"
+
+def time_runs(cmd: list, runs: int) -> list:
+    """Wall time in milliseconds of each run of cmd."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        samples.append((time.perf_counter() - start) * 1000)
+        if result.returncode not in (0, 1):
+            raise SystemExit(f"validator failed ({result.returncode}): {result.stderr.strip()}")
+    return samples
+
+def summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0], 2),
+        "median_ms": round(statistics.median(ordered), 2),
+        "p90_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+def heaviest_imports(record: Path, top: int) -> list:
+    """(cumulative_us, module) for the top-level imports of one cold, uncached run."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(VALIDATOR), "--no-cache", str(record)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # only top-level imports; nested ones are included in them
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure cold startup time of tools/validate.py.")
+    ap.add_argument("record", nargs="?", type=Path, default=ROOT / "examples" / "golden-record.yaml")
+    ap.add_argument("--runs", type=int, default=15)
+    ap.add_argument("--max-ms", type=float, default=None, help="fail if the uncached median exceeds this")
+    ap.add_argument("--imports", action="store_true", help="also list the heaviest imports")
+    ap.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = ap.parse_args()
+
+    record = args.record.resolve()
+    base = [sys.executable, str(VALIDATOR)]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = {
+            "record": str(record),
+            "python": sys.version.split()[0],
+            "no_cache": summarize(time_runs(base + ["--no-cache", str(record)], args.runs)),
+        }
+        time_runs(base + ["--cache-dir", cache_dir, str(record)], 1)  # populate
+        results["warm_cache"] = summarize(time_runs(base + ["--cache-dir", cache_dir, str(record)], args.runs))
+    results["interpreter_only"] = summarize(time_runs([sys.executable, "-c", "pass"], args.runs))
+    if args.imports:
+        results["imports_us"] = [{"module": m, "cumulative_us": us} for us, m in heaviest_imports(record, 10)]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"# Validator startup ({results['python']}, {args.runs} runs)")
+        for label in ("interpreter_only", "no_cache", "warm_cache"):
+            r = results[label]
+            print(f"- {label}: median {r['median_ms']} ms (min {r['min_ms']}, p90 {r['p90_ms']}, max {r['max_ms']})")
+        for row in results.get("imports_us", []):
+            print(f"  import {row['module']}: {row['cumulative_us'] / 1000:.1f} ms")
+
+    if args.max_ms is not None and results["no_cache"]["median_ms"] > args.max_ms:
+        print(f"REGRESSION: median {results['no_cache']['median_ms']} ms exceeds budget {args.max_ms} ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Validator throughput benchmark on synthetic corpora
+
+Synthesizes schema-conformant WorkUnits from examples/golden-record.yaml,
+scaling constraints, failing checks and files_changed per record and the
+number of records per corpus. For each scenario it reports records/sec,
+per-phase latency (load_record, schema_validate, invariants) and peak RSS.
+Each scenario runs in a fresh process so peak RSS is not inherited.
+
+Usage:
+  python3 tools/bench-validator.py                            # default matrix
+  python3 tools/bench-validator.py --items 1,100,1000 --corpus 10,1000
+  python3 tools/bench-validator.py --out bench.json
+  python3 tools/bench-validator.py --baseline bench.json --threshold 0.25
+
+With --baseline, exits 1 if any scenario's records/sec drops, or its phase
+p50 latency or peak RSS grows, by more than the threshold fraction.
+"""
+
+import argparse
+import copy
+import json
+import multiprocessing
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+import validate  # noqa: E402
+
+TEMPLATE = ROOT / "examples" / "golden-record.yaml"
+CONSTRAINT_TYPES = ["functional", "negative", "performance", "invariant", "compatibility", "security"]
+PHASES = ("load_record", "schema_validate", "invariants")
+
+def synthesize(template: dict, items: int, serial: int) -> dict:
+    """A VALID record with `items` constraints, failing checks and changed files."""
+    record = copy.deepcopy(template)
+    record["work_id"] = f"WU-BENCH-{serial:06d}"
+    record["mini_spec"]["constraints"] = [
+        {"id": f"C{i}", "statement": f"Synthetic constraint {i}", "type": CONSTRAINT_TYPES[i % len(CONSTRAINT_TYPES)]}
+        for i in range(1, items + 1)
+    ]
+    record["first_red"]["failing_checks"] = [
+        {"check_id": f"test_synthetic_{i}", "constraint_ids": [f"C{i}"],
+         "evidence_ref": "logs/first_red.txt", "coupling": "direct"}
+        for i in range(1, items + 1)
+    ]
+    record["diff_set"]["files_changed"] = [
+        {"path": f"app/module_{i}.py", "change_type": "modified"} for i in range(1, items + 1)
+    ]
+    record["diff_set"]["rationale"] = [
+        {"constraint_id": f"C{i}", "note": f"Rationale {i}"} for i in range(1, items + 1)
+    ]
+    return record
+
+def write_corpus(dest: Path, items: int, records: int) -> list:
+    yaml, _ = validate.yaml_loader()
+    template = validate.load_record(TEMPLATE)
+    shutil.copytree(ROOT / "examples" / "logs", dest / "logs")
+    paths = []
+    for serial in range(records):
+        p = dest / f"record-{serial:06d}.yaml"
+        p.write_text(yaml.safe_dump(synthesize(template, items, serial), sort_keys=False), encoding="utf-8")
+        paths.append(p)
+    return paths
+
+def peak_rss_bytes() -> int:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run_scenario(scenario: dict) -> dict:
+    """Validate one synthetic corpus and return its measurements (runs in a fresh process)."""
+    items, records = scenario["items"], scenario["records"]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_corpus(Path(tmp), items, records)
+
+        started = time.perf_counter()
+        validator = validate.compile_schema(validate.load_schema(validate.default_schema_path()))
+        compile_s = time.perf_counter() - started
+
+        timings = {phase: [] for phase in PHASES}
+        invalid = 0
+        started = time.perf_counter()
+        for p in paths:
+            t0 = time.perf_counter()
+            record = validate.load_record(p)
+            t1 = time.perf_counter()
+            errors = validate.schema_validate(validator, record)
+            t2 = time.perf_counter()
+            errors += validate.invariants(record, p)
+            t3 = time.perf_counter()
+            timings["load_record"].append(t1 - t0)
+            timings["schema_validate"].append(t2 - t1)
+            timings["invariants"].append(t3 - t2)
+            invalid += bool(errors)
+        elapsed = time.perf_counter() - started
+
+    phases = {}
+    for phase, samples in timings.items():
+        ordered = sorted(samples)
+        phases[phase] = {
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        }
+    return {
+        "name": f"items={items},records={records}",
+        "items": items,
+        "records": records,
+        "invalid": invalid,
+        "compile_schema_ms": round(compile_s * 1000, 3),
+        "records_per_sec": round(records / elapsed, 2),
+        "phases": phases,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Regression messages for scenarios present in both runs."""
+    base = {s["name"]: s for s in baseline.get("scenarios", [])}
+    regressions = []
+    for s in results:
+        b = base.get(s["name"])
+        if b is None:
+            continue
+        if s["records_per_sec"] < b["records_per_sec"] * (1 - threshold):
+            regressions.append(f"{s['name']}: records/sec {s['records_per_sec']} < baseline {b['records_per_sec']}")
+        for phase in PHASES:
+            now, then = s["phases"][phase]["p50_ms"], b["phases"][phase]["p50_ms"]
+            if then > 0 and now > then * (1 + threshold):
+                regressions.append(f"{s['name']}: {phase} p50 {now} ms > baseline {then} ms")
+        if s["peak_rss_bytes"] > b["peak_rss_bytes"] * (1 + threshold):
+            regressions.append(f"{s['name']}: peak RSS {s['peak_rss_bytes']} > baseline {b['peak_rss_bytes']}")
+    return regressions
+
+def int_list(text: str) -> list:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark validate.py phases on synthetic corpora.")
+    ap.add_argument("--items", type=int_list, default=[1, 10, 100, 1000],
+                    help="constraints / failing checks / files_changed per record (comma-separated)")
+    ap.add_argument("--corpus", type=int_list, default=[100],
+                    help="records per corpus (comma-separated)")
+    ap.add_argument("--out", type=Path, default=None, help="write JSON results here")
+    ap.add_argument("--baseline", type=Path, default=None, help="compare against a previous --out file")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression (default 0.25)")
+    args = ap.parse_args()
+
+    scenarios = [{"items": i, "records": r} for r in args.corpus for i in args.items]
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with ctx.Pool(processes=1, maxtasksperchild=1) as pool:
+        for s in scenarios:
+            r = pool.apply(run_scenario, (s,))
+            results.append(r)
+            ph = r["phases"]
+            print(f"{r['name']:>28}: {r['records_per_sec']:>10.1f} rec/s | "
+                  + " | ".join(f"{p} p50 {ph[p]['p50_ms']:.3f} ms" for p in PHASES)
+                  + f" | peak RSS {r['peak_rss_bytes'] / 2**20:.1f} MiB", flush=True)
+
+    report = {"python": sys.version.split()[0], "validator_version": validate.validator_version(),
+              "scenarios": results}
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+        if regressions:
+            print("\nREGRESSIONS")
+            for line in regressions:
+                print(f"- {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Columnar export and coverage analytics over a corpus of audit records
+
+Flattens records into NumPy column arrays, with one row per record, per
+constraint, per failing check and per check-to-constraint link.
+Categorical fields are stored as small integer codes. The fleet-wide
+aggregates are then computed with vectorized operations (bincount, isin,
+percentile) rather than loops over record dicts:
+
+  - share of critical constraints covered only by non-direct checks
+  - direct-red rate by constraint type
+  - failing-check coupling mix
+  - final_green.summary_metrics.duration_seconds distribution
+
+Files are parsed in parallel with -j. Each worker returns its columns as
+arrays, which are cheap to pickle. JSON Lines parses much faster than YAML
+on large corpora.
+
+Requires NumPy: pip install numpy
+
+Usage:
+  python3 tools/corpus-export.py examples/ 'challenge-packs/*/workunit.yaml'
+  python3 tools/corpus-export.py -j 8 agent-logs/ --format json
+  python3 tools/corpus-export.py agent-logs/ --out corpus-columns/
+
+With --out, writes records.npz, constraints.npz, failing_checks.npz,
+links.npz and columns.json (code labels and source paths).
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+import validate  # noqa: E402
+
+TYPES = ["functional", "negative", "performance", "invariant", "compatibility", "security", "other"]
+COUPLINGS = ["direct", "indirect", "incidental", "other"]
+TYPE_CODE = {t: i for i, t in enumerate(TYPES)}
+COUPLING_CODE = {c: i for i, c in enumerate(COUPLINGS)}
+CRITICAL_CODES = sorted(TYPE_CODE[t] for t in validate.CRITICAL_TYPES)
+DIRECT = COUPLING_CODE["direct"]
+PERCENTILES = (50, 90, 99)
+FLUSH_RECORDS = 65536  # records per file between conversions of the value lists to arrays
+
+# table -> {column: dtype}; "record" and "constraint" columns are row indexes into other tables.
+COLUMNS = {
+    "records": {"source": "int32", "duration_seconds": "float64", "checks_executed": "int64",
+                "all_checks_passed": "int8", "first_red_occurred": "int8"},
+    "constraints": {"record": "int64", "type": "int8"},
+    "failing_checks": {"record": "int64", "coupling": "int8", "constraints": "int32"},
+    "links": {"constraint": "int64", "coupling": "int8"},
+}
+
+def numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise SystemExit("NumPy not installed. Install with: pip install numpy")
+    return np
+
+def _items(value) -> list:
+    return [v for v in value if isinstance(v, dict)] if isinstance(value, list) else []
+
+def _section(record: dict, key: str) -> dict:
+    value = record.get(key)
+    return value if isinstance(value, dict) else {}
+
+def _number(value, missing):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else missing
+
+def _flag(value) -> int:
+    return int(value) if isinstance(value, bool) else -1
+
+def _is_key(value) -> bool:
+    return not isinstance(value, (list, dict))  # ids that fail the schema cannot be looked up
+
+def flatten_file(task: tuple) -> tuple:
+    """
+    (columns as arrays, unparseable documents) for one file; row indexes are
+    file-local. Records are read one at a time and the value lists are turned
+    into arrays every FLUSH_RECORDS records, so a large JSON Lines file never
+    sits in memory as Python objects.
+    """
+    source, path = task
+    np = numpy()
+    chunks = {table: {name: [] for name in columns} for table, columns in COLUMNS.items()}
+    cols = rec = con = chk = link = None
+    flushed_records = flushed_constraints = 0
+
+    def flush():
+        nonlocal cols, rec, con, chk, link, flushed_records, flushed_constraints
+        if cols is not None:
+            for table, columns in cols.items():
+                for name, values in columns.items():
+                    chunks[table][name].append(np.asarray(values, dtype=COLUMNS[table][name]))
+            flushed_records += len(rec["source"])
+            flushed_constraints += len(con["record"])
+        cols = {table: {name: [] for name in columns} for table, columns in COLUMNS.items()}
+        rec, con, chk, link = cols["records"], cols["constraints"], cols["failing_checks"], cols["links"]
+
+    flush()
+    errors = 0
+    try:
+        for _, record in validate.iter_records(Path(path)):
+            if not isinstance(record, dict):
+                errors += 1
+                continue
+            if len(rec["source"]) >= FLUSH_RECORDS:
+                flush()
+            r = flushed_records + len(rec["source"])
+            red, green = _section(record, "first_red"), _section(record, "final_green")
+            metrics = _section(green, "summary_metrics")
+            rec["source"].append(source)
+            rec["duration_seconds"].append(_number(metrics.get("duration_seconds"), float("nan")))
+            rec["checks_executed"].append(_number(metrics.get("checks_executed"), -1))
+            rec["all_checks_passed"].append(_flag(green.get("all_checks_passed")))
+            rec["first_red_occurred"].append(_flag(red.get("occurred")))
+
+            rows = {}
+            for c in _items(_section(record, "mini_spec").get("constraints")):
+                if _is_key(c.get("id")):
+                    rows.setdefault(c.get("id"), flushed_constraints + len(con["record"]))
+                con["record"].append(r)
+                con["type"].append(TYPE_CODE.get(c.get("type"), TYPE_CODE["other"]))
+            for check in _items(red.get("failing_checks")):
+                code = COUPLING_CODE.get(check.get("coupling"), COUPLING_CODE["other"])
+                ids = check.get("constraint_ids") if isinstance(check.get("constraint_ids"), list) else []
+                chk["record"].append(r)
+                chk["coupling"].append(code)
+                chk["constraints"].append(len(ids))
+                for cid in ids:
+                    if _is_key(cid) and cid in rows:
+                        link["constraint"].append(rows[cid])
+                        link["coupling"].append(code)
+    except OSError:
+        errors += 1
+    flush()
+    arrays = {table: {name: np.concatenate(parts) for name, parts in columns.items()}
+              for table, columns in chunks.items()}
+    return arrays, errors
+
+def concat(parts: list) -> dict:
+    """Join per-file columns, shifting file-local row indexes to corpus-wide ones."""
+    np = numpy()
+    out = {table: {name: [] for name in columns} for table, columns in COLUMNS.items()}
+    records = constraints = 0
+    for part in parts:
+        for table, columns in part.items():
+            for name, values in columns.items():
+                if name == "record":
+                    values = values + records
+                elif name == "constraint":
+                    values = values + constraints
+                out[table][name].append(values)
+        records += len(part["records"]["source"])
+        constraints += len(part["constraints"]["record"])
+    return {table: {name: np.concatenate(chunks) if chunks else np.empty(0, dtype=COLUMNS[table][name])
+                    for name, chunks in columns.items()}
+            for table, columns in out.items()}
+
+def load_columns(paths: list, jobs: int = 1) -> tuple:
+    """(columns, source paths, unparseable documents) for the corpus."""
+    tasks = list(enumerate(str(p) for p in paths))
+    if jobs > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(jobs) as pool:
+            results = pool.map(flatten_file, tasks, chunksize=max(1, len(tasks) // (jobs * 8)))
+    else:
+        results = [flatten_file(t) for t in tasks]
+    return concat([arrays for arrays, _ in results]), [p for _, p in tasks], sum(e for _, e in results)
+
+def _rate(part, whole) -> float | None:
+    return round(float(part) / float(whole), 4) if whole else None
+
+def summarize(cols: dict) -> dict:
+    np = numpy()
+    rec, con, chk, link = cols["records"], cols["constraints"], cols["failing_checks"], cols["links"]
+    n = len(con["type"])
+
+    mapped = np.bincount(link["constraint"], minlength=n)
+    direct = np.bincount(link["constraint"][link["coupling"] == DIRECT], minlength=n)
+    critical = np.isin(con["type"], CRITICAL_CODES)
+    indirect_only = critical & (mapped > 0) & (direct == 0)
+    uncovered = critical & (mapped == 0)
+
+    per_type = np.bincount(con["type"], minlength=len(TYPES))
+    direct_per_type = np.bincount(con["type"], weights=direct > 0, minlength=len(TYPES))
+    coupling_mix = np.bincount(chk["coupling"], minlength=len(COUPLINGS))
+
+    durations = rec["duration_seconds"][~np.isnan(rec["duration_seconds"])]
+    distribution = {"count": int(durations.size)}
+    if durations.size:
+        distribution.update(mean=round(float(durations.mean()), 4), min=round(float(durations.min()), 4),
+                            max=round(float(durations.max()), 4))
+        for q, value in zip(PERCENTILES, np.percentile(durations, PERCENTILES)):
+            distribution[f"p{q}"] = round(float(value), 4)
+
+    n_critical = int(critical.sum())
+    return {
+        "records": int(rec["source"].size),
+        "constraints": n,
+        "failing_checks": int(chk["coupling"].size),
+        "critical_constraints": n_critical,
+        "critical_indirect_only": int(indirect_only.sum()),
+        "critical_indirect_only_share": _rate(indirect_only.sum(), n_critical),
+        "critical_uncovered": int(uncovered.sum()),
+        "critical_uncovered_share": _rate(uncovered.sum(), n_critical),
+        "direct_red_by_type": {
+            t: {"constraints": int(per_type[i]), "direct_red": int(direct_per_type[i]),
+                "rate": _rate(direct_per_type[i], per_type[i])}
+            for i, t in enumerate(TYPES) if per_type[i]
+        },
+        "coupling_mix": {c: int(coupling_mix[i]) for i, c in enumerate(COUPLINGS) if coupling_mix[i]},
+        "final_green_passed_share": _rate((rec["all_checks_passed"] == 1).sum(), rec["source"].size),
+        "duration_seconds": distribution,
+    }
+
+def write_columns(out_dir: Path, cols: dict, sources: list) -> None:
+    np = numpy()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for table, columns in cols.items():
+        np.savez_compressed(out_dir / f"{table}.npz", **columns)
+    meta = {"types": TYPES, "couplings": COUPLINGS, "sources": sources,
+            "columns": COLUMNS, "validator_version": validate.validator_version()}
+    (out_dir / "columns.json").write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+
+def _pct(rate) -> str:
+    return "-" if rate is None else f"{rate:.1%}"
+
+def print_summary(s: dict, unparseable: int, seconds: float) -> None:
+    print(f"Records: {s['records']} ({unparseable} unparseable) | constraints: {s['constraints']} | "
+          f"failing checks: {s['failing_checks']} | {seconds:.2f} s")
+    print(f"\nCritical constraints ({', '.join(sorted(validate.CRITICAL_TYPES))}): {s['critical_constraints']}")
+    print(f"  covered only by non-direct checks: {s['critical_indirect_only']} "
+          f"({_pct(s['critical_indirect_only_share'])})")
+    print(f"  not covered by any failing check:  {s['critical_uncovered']} ({_pct(s['critical_uncovered_share'])})")
+    print("\nDirect-red rate by constraint type:")
+    for t, row in s["direct_red_by_type"].items():
+        print(f"  {t:<14} {row['direct_red']:>8}/{row['constraints']:<8} {_pct(row['rate']):>7}")
+    print("\nFailing-check coupling: " + ", ".join(f"{c} {n}" for c, n in s["coupling_mix"].items()))
+    print(f"Final green passed: {_pct(s['final_green_passed_share'])}")
+    d = s["duration_seconds"]
+    if d["count"]:
+        print(f"\nduration_seconds (n={d['count']}): mean {d['mean']} | "
+              + " | ".join(f"p{q} {d[f'p{q}']}" for q in PERCENTILES) + f" | max {d['max']}")
+    else:
+        print("\nduration_seconds: no records report it")
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Export audit records as columns and summarize coverage.")
+    ap.add_argument("paths", nargs="+", help="record files, directories or glob patterns")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="parse files in N processes")
+    ap.add_argument("--out", type=Path, default=None, help="write .npz column files to this directory")
+    ap.add_argument("--format", choices=["text", "json"], default="text")
+    args = ap.parse_args()
+
+    numpy()  # fail before parsing anything
+    started = time.perf_counter()
+    paths = validate.expand_paths(args.paths)
+    if not paths:
+        print("ERROR: no record files found", file=sys.stderr)
+        return 2
+    cols, sources, unparseable = load_columns(paths, args.jobs)
+    summary = summarize(cols)
+    if args.out:
+        write_columns(args.out, cols, sources)
+    seconds = time.perf_counter() - started
+    if args.format == "json":
+        print(json.dumps(dict(summary, unparseable=unparseable, seconds=round(seconds, 3)), indent=2))
+    else:
+        print_summary(summary, unparseable, seconds)
+        if args.out:
+            print(f"\nColumns written to {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+SQLite index over a corpus of audit records
+
+`ingest` loads records (YAML, JSON, JSON Lines, multi-document YAML) into a
+local SQLite database with one table per part of a WorkUnit. Ingestion is
+incremental: a file whose mtime and size are unchanged is skipped, a file
+whose content hash is unchanged only has its stat refreshed, and a changed
+file has its rows replaced. Files that disappeared under an ingested root
+are dropped. `query` answers the common questions from indexes.
+
+Tables:
+  sources          path, mtime_ns, size, sha256
+  work_units       id, source, location, work_id, timestamp_utc, repo_ref, human, agent,
+                   first_red_occurred, all_checks_passed, run_id, duration_seconds, checks_executed
+  constraints      wu, constraint_id, type, statement
+  failing_checks   wu, check_id, coupling, evidence_ref
+  check_constraints wu, check_id, constraint_id
+  files_changed    wu, path, change_type
+  spec_deltas      wu, changed, human_decision, changes (JSON)
+
+Usage:
+  python3 tools/corpus-index.py ingest examples/ 'challenge-packs/*/workunit.yaml'
+  python3 tools/corpus-index.py query --file app/routes.py
+  python3 tools/corpus-index.py query --agent agent-x
+  python3 tools/corpus-index.py query --indirect-only negative --count
+  python3 tools/corpus-index.py query --sql "SELECT type, COUNT(*) FROM constraints GROUP BY type"
+  python3 tools/corpus-index.py stats
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+import validate  # noqa: E402
+
+DEFAULT_DB = ROOT / ".ahs-cache" / "corpus.sqlite"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, sha256 TEXT);
+CREATE TABLE IF NOT EXISTS work_units (
+    id INTEGER PRIMARY KEY, source TEXT NOT NULL REFERENCES sources(path) ON DELETE CASCADE,
+    location TEXT, work_id TEXT, timestamp_utc TEXT, repo_ref TEXT, human TEXT, agent TEXT,
+    first_red_occurred INTEGER, all_checks_passed INTEGER, run_id TEXT,
+    duration_seconds REAL, checks_executed INTEGER);
+CREATE TABLE IF NOT EXISTS constraints (
+    wu INTEGER NOT NULL REFERENCES work_units(id) ON DELETE CASCADE,
+    constraint_id TEXT, type TEXT, statement TEXT);
+CREATE TABLE IF NOT EXISTS failing_checks (
+    wu INTEGER NOT NULL REFERENCES work_units(id) ON DELETE CASCADE,
+    check_id TEXT, coupling TEXT, evidence_ref TEXT);
+CREATE TABLE IF NOT EXISTS check_constraints (
+    wu INTEGER NOT NULL REFERENCES work_units(id) ON DELETE CASCADE,
+    check_id TEXT, constraint_id TEXT);
+CREATE TABLE IF NOT EXISTS files_changed (
+    wu INTEGER NOT NULL REFERENCES work_units(id) ON DELETE CASCADE,
+    path TEXT, change_type TEXT);
+CREATE TABLE IF NOT EXISTS spec_deltas (
+    wu INTEGER NOT NULL REFERENCES work_units(id) ON DELETE CASCADE,
+    changed INTEGER, human_decision TEXT, changes TEXT);
+CREATE INDEX IF NOT EXISTS work_units_source ON work_units(source);
+CREATE INDEX IF NOT EXISTS work_units_work_id ON work_units(work_id);
+CREATE INDEX IF NOT EXISTS work_units_agent ON work_units(agent);
+CREATE INDEX IF NOT EXISTS constraints_wu ON constraints(wu, constraint_id);
+CREATE INDEX IF NOT EXISTS constraints_type ON constraints(type, wu);
+CREATE INDEX IF NOT EXISTS failing_checks_wu ON failing_checks(wu, check_id);
+CREATE INDEX IF NOT EXISTS failing_checks_coupling ON failing_checks(coupling, wu);
+CREATE INDEX IF NOT EXISTS check_constraints_wu ON check_constraints(wu, constraint_id);
+CREATE INDEX IF NOT EXISTS files_changed_path ON files_changed(path, wu);
+CREATE INDEX IF NOT EXISTS files_changed_wu ON files_changed(wu);
+CREATE INDEX IF NOT EXISTS spec_deltas_wu ON spec_deltas(wu);
+"""
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    version = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    if version is None:
+        conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        conn.commit()
+    elif int(version[0]) != SCHEMA_VERSION:
+        raise SystemExit(f"{db_path} was built by another version of this tool; delete it and re-ingest")
+    return conn
+
+def _items(value) -> list:
+    return [v for v in value if isinstance(v, dict)] if isinstance(value, list) else []
+
+def _section(record: dict, key: str) -> dict:
+    value = record.get(key)
+    return value if isinstance(value, dict) else {}
+
+def _flag(value):
+    return int(value) if isinstance(value, bool) else None
+
+def _scalar(value):
+    """A value SQLite can bind: nested mappings and lists (and out-of-range ints) are stored as JSON text."""
+    if value is None or isinstance(value, (str, float)):
+        return value
+    if isinstance(value, int) and -(1 << 63) <= value < (1 << 63):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+def flatten(record: dict) -> dict:
+    """Rows for one record, keyed by table (child rows without the wu column)."""
+    rows = _rows(record)
+    return {table: tuple(map(_scalar, r)) if table == "work_unit" else [tuple(map(_scalar, row)) for row in r]
+            for table, r in rows.items()}
+
+def _rows(record: dict) -> dict:
+    actor = _section(record, "actor")
+    red = _section(record, "first_red")
+    green = _section(record, "final_green")
+    metrics = green.get("summary_metrics") if isinstance(green.get("summary_metrics"), dict) else {}
+    delta = _section(record, "spec_delta")
+    checks = _items(red.get("failing_checks"))
+    return {
+        "work_unit": (record.get("work_id"), record.get("timestamp_utc"), record.get("repo_ref"),
+                      actor.get("human"), actor.get("agent"), _flag(red.get("occurred")),
+                      _flag(green.get("all_checks_passed")), green.get("run_id"),
+                      metrics.get("duration_seconds"), metrics.get("checks_executed")),
+        "constraints": [(c.get("id"), c.get("type"), c.get("statement"))
+                        for c in _items(_section(record, "mini_spec").get("constraints"))],
+        "failing_checks": [(c.get("check_id"), c.get("coupling"), c.get("evidence_ref")) for c in checks],
+        "check_constraints": [(c.get("check_id"), cid) for c in checks
+                              for cid in (c.get("constraint_ids") if isinstance(c.get("constraint_ids"), list) else [])],
+        "files_changed": [(f.get("path"), f.get("change_type"))
+                          for f in _items(_section(record, "diff_set").get("files_changed"))],
+        "spec_deltas": [(_flag(delta.get("changed")), delta.get("human_decision"),
+                         json.dumps(delta.get("changes", []), sort_keys=True))] if delta else [],
+    }
+
+def parse_source(p: Path) -> tuple:
+    """(sha256, [(location, rows)], [(location, error)]) for one file; runs in worker processes."""
+    h = hashlib.sha256()
+    with open(p, "rb") as f:  # in chunks: a JSONL audit log can be several GB
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    records, errors = [], []
+    for location, record in validate.iter_records(p):
+        if isinstance(record, dict):
+            records.append((location, flatten(record)))
+        else:
+            errors.append((location, str(record) if isinstance(record, Exception) else "not a mapping"))
+    return h.hexdigest(), records, errors
+
+def _parse_task(task: tuple) -> tuple:
+    path, st = task
+    try:
+        return path, st, parse_source(Path(path))
+    except (OSError, ValueError) as e:
+        return path, st, e
+
+CHILD_TABLES = {
+    "constraints": 3, "failing_checks": 3, "check_constraints": 2, "files_changed": 2, "spec_deltas": 3,
+}
+
+def store(conn: sqlite3.Connection, path: str, st: tuple, sha: str, records: list) -> None:
+    """Replace one source's rows, one executemany per table (ids are allocated here)."""
+    conn.execute("DELETE FROM sources WHERE path = ?", (path,))  # cascades to the record rows
+    conn.execute("INSERT INTO sources VALUES (?, ?, ?, ?)", (path, st[0], st[1], sha))
+    first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM work_units").fetchone()[0]
+    conn.executemany("INSERT INTO work_units VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     [(first + n, path, location) + rows["work_unit"] for n, (location, rows) in enumerate(records)])
+    for table, width in CHILD_TABLES.items():
+        marks = ", ".join("?" * (width + 1))
+        conn.executemany(f"INSERT INTO {table} VALUES ({marks})",
+                         [(first + n,) + r for n, (_, rows) in enumerate(records) for r in rows[table]])
+
+def ingest(conn: sqlite3.Connection, args: list, jobs: int = 1, prune: bool = True) -> dict:
+    """Bring the index up to date with the given files, directories and globs."""
+    stats = {"scanned": 0, "unchanged": 0, "touched": 0, "ingested": 0, "removed": 0, "records": 0, "errors": []}
+    known = {path: (mtime, size, sha) for path, mtime, size, sha in conn.execute("SELECT * FROM sources")}
+    seen, todo = set(), []
+    for p in validate.expand_paths(args):
+        try:
+            s = p.stat()
+        except OSError as e:
+            stats["errors"].append(f"{p}: {e}")
+            continue
+        path, st = str(p.resolve()), (s.st_mtime_ns, s.st_size)
+        seen.add(path)
+        stats["scanned"] += 1
+        if known.get(path, (None, None))[:2] == st:
+            stats["unchanged"] += 1
+        else:
+            todo.append((path, st))
+
+    def parsed():
+        if jobs > 1 and len(todo) > 1:
+            with multiprocessing.Pool(jobs) as pool:
+                yield from pool.imap_unordered(_parse_task, todo, chunksize=max(1, len(todo) // (jobs * 8)))
+        else:
+            yield from map(_parse_task, todo)
+
+    with conn:
+        for path, st, outcome in parsed():
+            if isinstance(outcome, Exception):
+                stats["errors"].append(f"{path}: {outcome}")
+                continue
+            sha, records, errors = outcome
+            stats["errors"].extend(f"{path} ({loc}): {err}" for loc, err in errors)
+            if path in known and known[path][2] == sha:
+                conn.execute("UPDATE sources SET mtime_ns = ?, size = ? WHERE path = ?", (st[0], st[1], path))
+                stats["touched"] += 1
+                continue
+            store(conn, path, st, sha, records)
+            stats["ingested"] += 1
+            stats["records"] += len(records)
+        if prune:
+            roots = [str(Path(a).resolve()) for a in args if Path(a).is_dir()]
+            gone = [p for p in known if p not in seen
+                    and (any(p.startswith(r.rstrip("/") + "/") for r in roots) or not Path(p).exists())]
+            conn.executemany("DELETE FROM sources WHERE path = ?", [(p,) for p in gone])
+            stats["removed"] = len(gone)
+    conn.execute("PRAGMA optimize")  # refresh planner statistics for the query indexes
+    return stats
+
+def build_query(args) -> tuple:
+    """(sql, params) for the canned query options, combined with AND."""
+    where, params = [], []
+    if args.file:
+        where.append("w.id IN (SELECT wu FROM files_changed WHERE path = ?)")
+        params.append(args.file)
+    if args.agent:
+        where.append("w.agent = ?")
+        params.append(args.agent)
+    if args.human:
+        where.append("w.human = ?")
+        params.append(args.human)
+    if args.work_id:
+        where.append("w.work_id = ?")
+        params.append(args.work_id)
+    if args.constraint_type:
+        where.append("w.id IN (SELECT wu FROM constraints WHERE type = ?)")
+        params.append(args.constraint_type)
+    if args.indirect_only:
+        # Records where some constraint of this type is only reached through non-direct checks;
+        # driven from the (rare) non-direct checks so it stays fast on large corpora.
+        where.append("""w.id IN (
+            SELECT f.wu FROM failing_checks f
+            CROSS JOIN check_constraints cc ON cc.wu = f.wu AND cc.check_id = f.check_id
+            CROSS JOIN constraints c ON c.wu = cc.wu AND c.constraint_id = cc.constraint_id
+            WHERE f.coupling IN ('indirect', 'incidental') AND c.type = ? AND NOT EXISTS (
+                SELECT 1 FROM check_constraints d
+                JOIN failing_checks df ON df.wu = d.wu AND df.check_id = d.check_id
+                WHERE d.wu = c.wu AND d.constraint_id = c.constraint_id AND df.coupling = 'direct'))""")
+        params.append(args.indirect_only)
+    if args.spec_changed:
+        where.append("w.id IN (SELECT wu FROM spec_deltas WHERE changed = 1)")
+    if args.failed_green:
+        where.append("w.all_checks_passed = 0")
+    clause = f" WHERE {' AND '.join(where)}" if where else ""
+    if args.count:
+        return f"SELECT COUNT(*) AS records FROM work_units w{clause}", params
+    return (f"SELECT w.work_id, w.agent, w.timestamp_utc, w.source, w.location FROM work_units w{clause} "
+            f"ORDER BY w.timestamp_utc, w.work_id LIMIT ?", params + [args.limit])
+
+def print_rows(cursor: sqlite3.Cursor, fmt: str) -> int:
+    columns = [d[0] for d in cursor.description or []]
+    rows = cursor.fetchall()
+    if fmt == "json":
+        print(json.dumps([dict(zip(columns, r)) for r in rows], indent=2))
+    else:
+        if columns:
+            print("\t".join(columns))
+        for r in rows:
+            print("\t".join("" if v is None else str(v) for v in r))
+    return len(rows)
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Index audit records in SQLite and query them.")
+    ap.add_argument("--db", type=Path, default=DEFAULT_DB, help=f"index database (default: {DEFAULT_DB})")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    ing = sub.add_parser("ingest", help="add or refresh records (incremental)")
+    ing.add_argument("paths", nargs="+", help="record files, directories or glob patterns")
+    ing.add_argument("-j", "--jobs", type=int, default=1, help="parse changed files in N processes")
+    ing.add_argument("--no-prune", action="store_true", help="keep rows for files that no longer exist")
+
+    q = sub.add_parser("query", help="find WorkUnits (options combine with AND)")
+    q.add_argument("--file", help="records whose diff_set touched this path")
+    q.add_argument("--agent", help="records by this actor.agent")
+    q.add_argument("--human", help="records by this actor.human")
+    q.add_argument("--work-id", help="records with this work_id")
+    q.add_argument("--constraint-type", help="records with a constraint of this type")
+    q.add_argument("--indirect-only", metavar="TYPE",
+                   help="records with a TYPE constraint whose failing checks are all non-direct")
+    q.add_argument("--spec-changed", action="store_true", help="records with spec_delta.changed true")
+    q.add_argument("--failed-green", action="store_true", help="records whose final green did not pass")
+    q.add_argument("--sql", help="run this read-only SQL instead of the options above")
+    q.add_argument("--count", action="store_true", help="print only the number of matching records")
+    q.add_argument("--limit", type=int, default=1000)
+    q.add_argument("--format", choices=["text", "json"], default="text")
+
+    sub.add_parser("stats", help="row counts per table")
+    args = ap.parse_args()
+
+    conn = connect(args.db)
+    started = time.perf_counter()
+    if args.command == "ingest":
+        stats = ingest(conn, args.paths, args.jobs, prune=not args.no_prune)
+        for err in stats["errors"]:
+            print(f"WARNING: {err}", file=sys.stderr)
+        print(f"Scanned {stats['scanned']} files: {stats['ingested']} ingested ({stats['records']} records), "
+              f"{stats['unchanged']} unchanged, {stats['touched']} touched, {stats['removed']} removed "
+              f"in {time.perf_counter() - started:.2f} s")
+        return 0
+    if args.command == "stats":
+        for table in ("sources", "work_units", "constraints", "failing_checks", "check_constraints",
+                      "files_changed", "spec_deltas"):
+            print(f"{table:>18}: {conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]}")
+        return 0
+
+    if args.sql:
+        conn.execute("PRAGMA query_only=ON")
+        try:
+            cursor = conn.execute(args.sql)
+        except sqlite3.Error as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+    else:
+        cursor = conn.execute(*build_query(args))
+    n = print_rows(cursor, args.format)
+    print(f"{n} row{'s' if n != 1 else ''} in {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
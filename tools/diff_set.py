@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Streaming diff_set builder from git plumbing
+
+Reads `git diff -z --name-status` incrementally and yields `files_changed`
+entries as git produces them, so a 50k-file changeset never has to sit in
+memory as one diff. Renames are detected with -M, and a
+rename is reported as `renamed` under its new path (copies as `added`). With line counts,
+`git diff -z --numstat` runs alongside and is consumed in lockstep (both
+commands list files in the same order), which adds `lines_added` and
+`lines_deleted`. Binary files get no counts.
+
+Usage:
+  python3 tools/diff_set.py abc123 def456                  # diff_set block as YAML
+  python3 tools/diff_set.py main HEAD --line-counts --repo ../app
+  python3 tools/diff_set.py HEAD~1 --format jsonl          # base vs. working tree, one entry per line
+
+As a module: diff_set.iter_files_changed(repo, base_ref, final_ref, line_counts=False)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+CHUNK_BYTES = 1 << 16
+CHANGE_TYPES = {"M": "modified", "T": "modified", "U": "modified", "A": "added", "C": "added",
+                "D": "deleted", "R": "renamed"}
+
+def _nul_fields(stream):
+    """Yield NUL-terminated fields from a binary stream, reading fixed-size chunks."""
+    pending = b""
+    while True:
+        chunk = stream.read(CHUNK_BYTES)
+        if not chunk:
+            break
+        parts = (pending + chunk).split(b"\0")
+        pending = parts.pop()
+        for part in parts:
+            yield part.decode("utf-8", errors="surrogateescape")
+    if pending:
+        yield pending.decode("utf-8", errors="surrogateescape")
+
+def _git_diff(repo: Path, base_ref: str, final_ref: str | None, fmt: str) -> subprocess.Popen:
+    revs = [base_ref] + ([final_ref] if final_ref else [])
+    return subprocess.Popen(["git", "-C", str(repo), "diff", "-z", "-M", "--no-color", fmt, *revs, "--"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def _name_status(fields):
+    """(status letter, path) pairs; copies and renames report their destination path."""
+    for status in fields:
+        path = next(fields)
+        if status[:1] in ("R", "C"):
+            path = next(fields)
+        yield status[:1], path
+
+def _numstat(fields):
+    """(lines_added, lines_deleted) pairs, None for binary files."""
+    for field in fields:
+        added, deleted, path = field.split("\t", 2)
+        if not path:  # rename/copy: the old and new paths follow as separate fields
+            next(fields)
+            next(fields)
+        yield (None, None) if added == "-" else (int(added), int(deleted))
+
+def _finish(proc: subprocess.Popen) -> None:
+    err = proc.stderr.read().decode("utf-8", errors="replace").strip()
+    if proc.wait() != 0:
+        raise ValueError(f"git diff failed: {(err.splitlines() or [''])[0]}")
+
+def iter_files_changed(repo: Path, base_ref: str, final_ref: str | None = None, line_counts: bool = False):
+    """
+    Yield files_changed entries ({"path", "change_type"} plus optional
+    "lines_added"/"lines_deleted") between base_ref and final_ref, or
+    between base_ref and the working tree when final_ref is None. Raises
+    ValueError if git fails.
+    """
+    names = _git_diff(repo, base_ref, final_ref, "--name-status")
+    counts = _git_diff(repo, base_ref, final_ref, "--numstat") if line_counts else None
+    try:
+        stats = _numstat(_nul_fields(counts.stdout)) if counts else None
+        for status, path in _name_status(_nul_fields(names.stdout)):
+            entry = {"path": path, "change_type": CHANGE_TYPES.get(status, "modified")}
+            if stats is not None:
+                added, deleted = next(stats, (None, None))
+                if added is not None:
+                    entry["lines_added"] = added
+                    entry["lines_deleted"] = deleted
+            yield entry
+        _finish(names)
+        if counts:
+            _finish(counts)
+    finally:
+        for proc in (names, counts):
+            if proc and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+def _yaml_entry(entry: dict, indent: str) -> str:
+    # JSON strings are valid YAML double-quoted scalars, so no YAML emitter is needed per line.
+    lines = [f"{indent}- path: {json.dumps(entry['path'])}", f"{indent}  change_type: {entry['change_type']}"]
+    lines += [f"{indent}  {key}: {entry[key]}" for key in ("lines_added", "lines_deleted") if key in entry]
+    return "\n".join(lines) + "\n"
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Stream a diff_set.files_changed list from git.")
+    ap.add_argument("base_ref")
+    ap.add_argument("final_ref", nargs="?", default=None, help="default: the working tree")
+    ap.add_argument("--repo", type=Path, default=Path("."), help="git working tree (default: .)")
+    ap.add_argument("--line-counts", action="store_true", help="add lines_added / lines_deleted per file")
+    ap.add_argument("--format", choices=["yaml", "jsonl"], default="yaml",
+                    help="yaml: a diff_set block to paste into a record; jsonl: one entry per line")
+    args = ap.parse_args()
+
+    out = sys.stdout
+    if args.format == "yaml":
+        out.write(f"diff_set:\n  base_ref: {json.dumps(args.base_ref)}\n"
+                  f"  final_ref: {json.dumps(args.final_ref or 'WORKTREE')}\n")
+    n = 0
+    try:
+        for entry in iter_files_changed(args.repo, args.base_ref, args.final_ref, args.line_counts):
+            if args.format == "jsonl":
+                out.write(json.dumps(entry) + "\n")
+            else:
+                out.write(("" if n else "  files_changed:\n") + _yaml_entry(entry, "  "))
+            n += 1
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if args.format == "yaml":
+        out.write(("" if n else "  files_changed: []\n") + "  rationale: []\n")
+    print(f"{n} file{'s' if n != 1 else ''} changed", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
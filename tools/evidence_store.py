@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Content-addressed, compressed evidence store
+
+Logs are stored once under their SHA-256, compressed with zstd when the
+`zstandard` module is installed and with gzip otherwise. Near-identical runs
+still cost one object each, but identical ones (re-runs, the same log
+shared by many records) are stored once. A record points at an object with
+`evidence_ref: sha256:<hex>`. The validator resolves such refs through the
+store's index, which is one append-only file read once per process, instead
+of stat'ing a file per ref. Because the key is the content hash, an
+`evidence_sha256` next to a store ref is checked without reading the object.
+
+Layout (a store is found by walking up from the record to a `.ahs-evidence/`
+directory, or taken from $AHS_EVIDENCE_STORE):
+
+  .ahs-evidence/index.jsonl                   {"sha256", "size", "stored", "codec"} per object
+  .ahs-evidence/objects/ab/cdef....{gz,zst}
+
+Usage:
+  python3 tools/evidence_store.py put logs/first_red.txt logs/final_green.txt
+  python3 tools/evidence_store.py adopt examples/golden-record.yaml   # copy a record's evidence into the store, rewrite refs
+  python3 tools/evidence_store.py get sha256:<hex> [-o out.txt]
+  python3 tools/evidence_store.py stats
+  python3 tools/evidence_store.py verify
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+STORE_DIRNAME = ".ahs-evidence"
+REF_PREFIX = "sha256:"
+CHUNK_BYTES = 1 << 20
+
+def is_store_ref(ref) -> bool:
+    return isinstance(ref, str) and ref.startswith(REF_PREFIX)
+
+def ref_key(ref: str) -> str:
+    return ref[len(REF_PREFIX):].lower()
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+class EvidenceStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.index_path = self.root / "index.jsonl"
+        self._index: dict[str, dict] = {}
+        self._index_stat: tuple | None = None
+
+    # --- index ------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """(Re)load the index if it changed since the last load; appends are read incrementally."""
+        try:
+            st = self.index_path.stat()
+        except OSError:
+            self._index, self._index_stat = {}, None
+            return
+        if self._index_stat and (st.st_ino, st.st_mtime_ns, st.st_size) == self._index_stat:
+            return
+        offset = self._index_stat[2] if self._index_stat and st.st_ino == self._index_stat[0] else 0
+        if offset == 0 or st.st_size < offset:
+            self._index, offset = {}, 0
+        with open(self.index_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]  # ignore a torn last line
+        for line in complete.splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                self._index[entry["sha256"]] = entry
+        self._index_stat = (st.st_ino, st.st_mtime_ns, offset + len(complete))
+
+    def contains(self, key: str) -> bool:
+        if self._index_stat is None:
+            self.refresh()
+        return key in self._index
+
+    def info(self, key: str) -> dict | None:
+        if self._index_stat is None:
+            self.refresh()
+        return self._index.get(key)
+
+    def entries(self) -> list[dict]:
+        self.refresh()
+        return list(self._index.values())
+
+    def _append_index(self, entry: dict) -> None:
+        line = (json.dumps(entry, sort_keys=True) + "\n").encode("utf-8")
+        fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)  # one O_APPEND write: concurrent writers never interleave a line
+        finally:
+            os.close(fd)
+        self._index[entry["sha256"]] = entry
+
+    # --- objects ----------------------------------------------------------
+
+    def object_path(self, key: str, codec: str) -> Path:
+        return self.root / "objects" / key[:2] / f"{key[2:]}.{'zst' if codec == 'zstd' else 'gz'}"
+
+    def put_file(self, src: Path, codec: str | None = None) -> tuple[str, bool]:
+        """Store a file; returns (ref, stored). stored is False when the content was already present."""
+        codec = codec or ("zstd" if _zstd() else "gzip")
+        if codec == "zstd" and not _zstd():
+            raise SystemExit("zstandard not installed. Install with: pip install zstandard")
+        self.refresh()
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        h = hashlib.sha256()
+        size = 0
+        # Hash and compress in one streaming pass into a temp file, then rename it into place.
+        fd, tmp = tempfile.mkstemp(dir=self.root / "objects", prefix=".put-")
+        try:
+            with open(src, "rb") as f, os.fdopen(fd, "wb") as raw:
+                if codec == "zstd":
+                    out = _zstd().ZstdCompressor(level=10).stream_writer(raw, closefd=False)
+                else:
+                    out = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0)
+                with out:
+                    for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+                        h.update(chunk)
+                        size += len(chunk)
+                        out.write(chunk)
+            key = h.hexdigest()
+            if key in self._index:
+                return REF_PREFIX + key, False
+            dest = self.object_path(key, codec)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            stored = os.path.getsize(tmp)
+            os.replace(tmp, dest)
+            tmp = None
+        finally:
+            if tmp is not None:
+                os.unlink(tmp)
+        self._append_index({"sha256": key, "size": size, "stored": stored, "codec": codec})
+        return REF_PREFIX + key, True
+
+    def open(self, ref: str):
+        """Binary file object with the decompressed content of a stored ref."""
+        key = ref_key(ref)
+        entry = self.info(key)
+        if entry is None:
+            raise KeyError(ref)
+        path = self.object_path(key, entry["codec"])
+        if entry["codec"] == "zstd":
+            zstandard = _zstd()
+            if zstandard is None:
+                raise SystemExit("zstandard not installed. Install with: pip install zstandard")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return gzip.open(path, "rb")
+
+    def verify(self, key: str) -> bool:
+        h = hashlib.sha256()
+        try:
+            with self.open(REF_PREFIX + key) as f:
+                for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+                    h.update(chunk)
+        except (OSError, EOFError, KeyError):
+            return False
+        return h.hexdigest() == key
+
+_STORES: dict[Path, EvidenceStore] = {}
+_FOUND: dict[Path, Path] = {}
+
+def open_store(root: Path) -> EvidenceStore:
+    """Shared EvidenceStore per root, so the index is parsed once per process."""
+    root = Path(root).resolve()
+    if root not in _STORES:
+        _STORES[root] = EvidenceStore(root)
+    return _STORES[root]
+
+def find_store(start: Path) -> EvidenceStore | None:
+    """$AHS_EVIDENCE_STORE, else the nearest `.ahs-evidence/` at or above `start` (hits are memoized, misses are not)."""
+    env = os.environ.get("AHS_EVIDENCE_STORE")
+    if env:
+        return open_store(Path(env))
+    start = Path(start).resolve()
+    if start not in _FOUND:
+        for d in (start, *start.parents):
+            if (d / STORE_DIRNAME).is_dir():
+                _FOUND[start] = d / STORE_DIRNAME
+                break
+        else:
+            return None  # a store may be created later, e.g. by `put` in a running daemon's tree
+    return open_store(_FOUND[start])
+
+def index_candidates(start: Path) -> list[Path]:
+    """
+    Index files that decide find_store(start), nearest first and ending at the
+    store in use: creating a store at any of them changes which refs resolve.
+    """
+    env = os.environ.get("AHS_EVIDENCE_STORE")
+    if env:
+        return [Path(env).resolve() / "index.jsonl"]
+    out = []
+    start = Path(start).resolve()
+    for d in (start, *start.parents):
+        out.append(d / STORE_DIRNAME / "index.jsonl")
+        if (d / STORE_DIRNAME).is_dir():
+            break
+    return out
+
+def default_root(start: Path) -> Path:
+    store = find_store(start)
+    return store.root if store else Path(start).resolve() / STORE_DIRNAME
+
+# An `evidence_ref` key and its scalar value, in YAML block style or JSON: "double", 'single' or plain.
+_REF_VALUE = re.compile(r"""(["']?evidence_ref["']?[ \t]*:[ \t]*)"""
+                        r"""("(?:[^"\\\n]|\\.)*"|'(?:[^'\n]|'')*'|[^\s"'#,{}\[\]][^\n#,{}\[\]]*)""")
+
+def _unquote(token: str) -> str:
+    if token.startswith('"'):
+        return json.loads(token)
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+    return token.rstrip()
+
+def rewrite_refs(text: str, replacements: dict[str, str]) -> str:
+    """Replace evidence_ref values in place, keeping comments, key order and quoting style."""
+    def swap(m: re.Match) -> str:
+        token = m.group(2)
+        try:
+            new = replacements.get(_unquote(token))
+        except ValueError:
+            new = None
+        if new is None:
+            return m.group(0)
+        quote = token[0] if token[0] in "'\"" else ""
+        return f"{m.group(1)}{quote}{new}{quote}{token[len(token.rstrip()):] if not quote else ''}"
+    return _REF_VALUE.sub(swap, text)
+
+def adopt(record_path: Path, store: EvidenceStore, codec: str | None = None) -> list[tuple[str, str]]:
+    """
+    Store a record's local evidence and rewrite its refs to store keys; returns
+    (old, new) pairs. Only the ref values are edited, so comments survive.
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import validate
+
+    record = validate.load_record(record_path)
+    holders = [fc for fc in record.get("first_red", {}).get("failing_checks", []) if isinstance(fc, dict)]
+    holders.append(record.get("final_green", {}))
+    changed = []
+    for holder in holders:
+        ref = holder.get("evidence_ref")
+        if not isinstance(ref, str) or not ref or "://" in ref or is_store_ref(ref):
+            continue
+        src = (record_path.parent / ref).resolve()
+        if not src.is_file():
+            continue
+        new_ref, _ = store.put_file(src, codec)
+        holder["evidence_ref"] = new_ref
+        changed.append((ref, new_ref))
+    if changed:
+        text = rewrite_refs(record_path.read_text(encoding="utf-8"), dict(changed))
+        if validate.parse_record(text, record_path.suffix) != record:
+            raise ValueError(f"{record_path}: evidence_ref values are not plain scalars; rewrite them by hand")
+        tmp = record_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, record_path)
+    return changed
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Content-addressed, compressed evidence store.")
+    ap.add_argument("--store", type=Path, default=None,
+                    help=f"store directory (default: $AHS_EVIDENCE_STORE or the nearest {STORE_DIRNAME}/)")
+    ap.add_argument("--codec", choices=["gzip", "zstd"], default=None, help="default: zstd if installed, else gzip")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p_put = sub.add_parser("put", help="store files and print their refs")
+    p_put.add_argument("files", nargs="+", type=Path)
+    p_adopt = sub.add_parser("adopt", help="store a record's local evidence and point its evidence_refs at the store")
+    p_adopt.add_argument("records", nargs="+", type=Path)
+    p_get = sub.add_parser("get", help="write a stored object's content")
+    p_get.add_argument("ref")
+    p_get.add_argument("-o", "--output", type=Path, default=None, help="default: stdout")
+    sub.add_parser("stats", help="objects, raw and stored bytes")
+    sub.add_parser("verify", help="re-hash every object")
+    args = ap.parse_args()
+
+    store = open_store(args.store) if args.store else None
+
+    if args.command == "adopt":
+        for record_path in args.records:
+            # Without --store, use the store the validator will resolve this record's refs through.
+            target = store or open_store(default_root(record_path.resolve().parent))
+            try:
+                changed = adopt(record_path, target, args.codec)
+            except ValueError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                return 1
+            for old, new in changed:
+                print(f"{record_path}: {old} -> {new}")
+            if not changed:
+                print(f"{record_path}: no local evidence to adopt")
+        return 0
+    store = store or open_store(default_root(Path.cwd()))
+    if args.command == "put":
+        for f in args.files:
+            ref, stored = store.put_file(f, args.codec)
+            entry = store.info(ref_key(ref))
+            note = f"{entry['stored']}/{entry['size']} bytes" if stored else "already stored"
+            print(f"{ref}  {f}  ({note})")
+        return 0
+    if args.command == "get":
+        try:
+            src = store.open(args.ref)
+        except KeyError:
+            print(f"ERROR: {args.ref} is not in {store.root}", file=sys.stderr)
+            return 1
+        with src:
+            if args.output:
+                with open(args.output, "wb") as out:
+                    shutil.copyfileobj(src, out)
+            else:
+                shutil.copyfileobj(src, sys.stdout.buffer)
+        return 0
+    if args.command == "stats":
+        entries = store.entries()
+        raw = sum(e["size"] for e in entries)
+        stored = sum(e["stored"] for e in entries)
+        ratio = f"{raw / stored:.1f}x" if stored else "-"
+        print(f"{store.root}: {len(entries)} objects, {raw} bytes raw, {stored} bytes stored ({ratio})")
+        return 0
+    bad = [e["sha256"] for e in store.entries() if not store.verify(e["sha256"])]
+    for key in bad:
+        print(f"CORRUPT {REF_PREFIX}{key}")
+    print(f"{len(store.entries()) - len(bad)} objects OK, {len(bad)} corrupt")
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Mutation fuzzer for the adversarial suite
+
+Mutates the golden record and the attack records (flip coupling labels,
+drop constraint_ids, retype constraints, reorder timestamps, detach
+evidence refs, toggle spec_delta / first_red / final_green, perturb or
+duplicate benchmark results) and checks each mutant against an oracle: the set of
+invariant rules that must fire, computed straight from the rule
+definitions rather than through validate.RecordIndex. A mutant fails when
+the validator misses a rule the oracle requires, or fires one the oracle
+rules out.
+
+Mutants are generated and checked in-process on every core (invariants
+only; the schema is not what is being fuzzed). Failing mutants are
+minimized by reverting their differences from the seed one at a time, and
+missed-rule cases are saved as attack YAMLs.
+
+Usage:
+  python3 tools/fuzz-attacks.py                         # 100k mutants
+  python3 tools/fuzz-attacks.py --mutants 1000000 --jobs 8 --seed 7
+  python3 tools/fuzz-attacks.py --out /tmp/fuzz --max-save 5
+  python3 tools/fuzz-attacks.py --no-save
+
+Exits 1 if any mutant fails.
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+import validate  # noqa: E402
+
+DEFAULT_SEEDS = [ROOT / "examples" / "golden-record.yaml"] + sorted((ROOT / "examples" / "attacks").glob("*.yaml"))
+COUPLINGS = ["direct", "indirect", "incidental"]
+CONSTRAINT_TYPES = ["functional", "negative", "performance", "invariant", "compatibility", "security"]
+CRITICAL = {"functional", "negative", "performance"}
+DETACHED_REFS = ["logs/missing.txt", "../nowhere/first_red.txt", "", "https://ci.example/runs/1"]
+BATCH = 2000
+
+def parse_utc(text):
+    return datetime.fromisoformat(text.replace("Z", "+00:00"))
+
+def oracle(record: dict, record_path: Path) -> set:
+    """Rule ids that must fire for record, read directly off the invariant definitions."""
+    must = set()
+    spec = record.get("mini_spec") or {}
+    red = record.get("first_red") or {}
+    green = record.get("final_green") or {}
+    delta = record.get("spec_delta") or {}
+    constraints = [c for c in spec.get("constraints") or [] if isinstance(c, dict)]
+    checks = [c for c in red.get("failing_checks") or [] if isinstance(c, dict)]
+
+    if not constraints:
+        must.add("constraints-present")
+    if red.get("occurred") is not True:
+        must.add("first-red-occurred")
+    elif not checks:
+        must.add("first-red-has-checks")
+    if green.get("all_checks_passed") is not True:
+        must.add("final-green-passed")
+    if delta.get("changed") is True and (delta.get("human_decision") not in ("accepted", "rejected")
+                                         or not delta.get("changes")):
+        must.add("spec-delta-decided")
+
+    for c in constraints:
+        if c.get("type") not in CRITICAL:
+            continue
+        mapped = [fc for fc in checks if c.get("id") in (fc.get("constraint_ids") or [])]
+        if not mapped:
+            must.add("constraint-coverage")
+        if not any(fc.get("coupling") == "direct" for fc in mapped):
+            must.add("direct-red")
+
+    metrics = green.get("summary_metrics") if isinstance(green.get("summary_metrics"), dict) else {}
+    benchmarks = [b for b in metrics.get("benchmarks") or [] if isinstance(b, dict)]
+    results = {}
+    for b in benchmarks:
+        if not isinstance(b.get("constraint_id"), (list, dict)):
+            results.setdefault(b.get("constraint_id"), []).append(b)
+    for c in constraints:
+        limits = c.get("thresholds")
+        if not isinstance(limits, dict) or isinstance(c.get("id"), (list, dict)):
+            continue
+        benches = results.get(c.get("id"))
+        if not benches:
+            must.add("performance-thresholds")
+            continue
+        for bench in benches:
+            for name, bound in limits.items():
+                if not isinstance(bound, (int, float)) or isinstance(bound, bool):
+                    continue  # left to the schema
+                kind, metric = name.split("_", 1)  # min_samples -> bench["samples"] >= bound
+                value = bench.get(metric)
+                if (not isinstance(value, (int, float)) or isinstance(value, bool)
+                        or (kind == "min" and value < bound) or (kind == "max" and value > bound)):
+                    must.add("performance-thresholds")
+    ids = {c.get("id") for c in constraints if not isinstance(c.get("id"), (list, dict))}
+    if any(cid not in ids for cid in results):
+        must.add("performance-thresholds")
+
+    stamp, run_id = record.get("timestamp_utc"), green.get("run_id")
+    if isinstance(stamp, str) and isinstance(run_id, str) and stamp and run_id:
+        try:
+            if parse_utc(stamp) > parse_utc(run_id.replace("run-", "")):
+                must.add("timestamp-order")
+        except (ValueError, TypeError):
+            pass
+
+    for holder in checks + [green]:
+        ref = holder.get("evidence_ref", "")
+        if not isinstance(ref, str) or not ref or "://" in ref:
+            continue
+        p = record_path.parent / ref
+        if not p.exists():
+            must.add("evidence-exists")
+        elif holder.get("evidence_sha256") and hashlib.sha256(p.read_bytes()).hexdigest() != holder["evidence_sha256"]:
+            must.add("evidence-sha256")
+    return must
+
+def fired(record: dict, record_path: Path) -> set:
+    return {rule_id for rule_id, _, _ in validate.run_rules(validate.RecordIndex(record, record_path))}
+
+def compare(record: dict, record_path: Path) -> tuple:
+    """(missed, spurious) rule ids; both empty when the validator agrees with the oracle."""
+    expected, actual = oracle(record, record_path), fired(record, record_path)
+    return tuple(sorted(expected - actual)), tuple(sorted(actual - expected))
+
+def _checks(record):
+    checks = (record.get("first_red") or {}).get("failing_checks")
+    return [c for c in checks if isinstance(c, dict)] if isinstance(checks, list) else []
+
+def _constraints(record):
+    constraints = (record.get("mini_spec") or {}).get("constraints")
+    return [c for c in constraints if isinstance(c, dict)] if isinstance(constraints, list) else []
+
+def flip_coupling(record, rng):
+    checks = _checks(record)
+    if checks:
+        fc = rng.choice(checks)
+        fc["coupling"] = rng.choice([c for c in COUPLINGS if c != fc.get("coupling")])
+
+def drop_constraint_ids(record, rng):
+    checks = [fc for fc in _checks(record) if fc.get("constraint_ids")]
+    if checks:
+        fc = rng.choice(checks)
+        if rng.random() < 0.3:
+            fc["constraint_ids"] = []
+        else:
+            fc["constraint_ids"] = [cid for cid in fc["constraint_ids"] if cid != rng.choice(fc["constraint_ids"])]
+
+def retype_constraint(record, rng):
+    constraints = _constraints(record)
+    if constraints:
+        rng.choice(constraints)["type"] = rng.choice(CONSTRAINT_TYPES)
+
+def reorder_timestamps(record, rng):
+    green = record.get("final_green")
+    if not isinstance(green, dict) or not isinstance(green.get("run_id"), str):
+        return
+    try:
+        run_dt = parse_utc(green["run_id"].replace("run-", ""))
+    except ValueError:
+        return
+    shifted = run_dt + timedelta(seconds=rng.randint(-86400, 86400))
+    stamp = shifted.strftime("%Y-%m-%dT%H:%M:%SZ")
+    if rng.random() < 0.5:
+        record["timestamp_utc"] = stamp
+    else:
+        green["run_id"] = f"run-{stamp}"
+
+def detach_evidence(record, rng):
+    holders = _checks(record) + ([record["final_green"]] if isinstance(record.get("final_green"), dict) else [])
+    if holders:
+        rng.choice(holders)["evidence_ref"] = rng.choice(DETACHED_REFS)
+
+def toggle_spec_delta(record, rng):
+    delta = record.setdefault("spec_delta", {})
+    if not isinstance(delta, dict):
+        return
+    delta["changed"] = not delta.get("changed")
+    if rng.random() < 0.5:
+        delta["human_decision"] = rng.choice(["accepted", "rejected", "n/a", "pending"])
+    if rng.random() < 0.5:
+        delta["changes"] = rng.choice([[], ["C1 statement reworded"]])
+
+def toggle_first_red(record, rng):
+    red = record.get("first_red")
+    if not isinstance(red, dict):
+        return
+    if rng.random() < 0.5:
+        red["occurred"] = not red.get("occurred")
+    else:
+        red["failing_checks"] = []
+
+def toggle_final_green(record, rng):
+    green = record.get("final_green")
+    if isinstance(green, dict):
+        green["all_checks_passed"] = not green.get("all_checks_passed")
+
+def perturb_benchmark(record, rng):
+    metrics = (record.get("final_green") or {}).get("summary_metrics")
+    benchmarks = [b for b in metrics.get("benchmarks") or [] if isinstance(b, dict)] if isinstance(metrics, dict) else []
+    numeric = [(b, k) for b in benchmarks for k, v in b.items() if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    if numeric:
+        bench, key = rng.choice(numeric)
+        if rng.random() < 0.2:
+            del bench[key]
+        else:
+            bench[key] = round(bench[key] * rng.uniform(0.5, 1.5), 3)
+
+def duplicate_benchmark(record, rng):
+    # A second entry for the same constraint, with rescaled numbers, must not mask the first one's result
+    metrics = (record.get("final_green") or {}).get("summary_metrics")
+    benchmarks = [b for b in metrics.get("benchmarks") or [] if isinstance(b, dict)] if isinstance(metrics, dict) else []
+    if benchmarks:
+        copy = {k: round(v * rng.uniform(0.25, 4), 3) if isinstance(v, (int, float)) and not isinstance(v, bool) else v
+                for k, v in rng.choice(benchmarks).items()}
+        metrics["benchmarks"].insert(rng.randrange(len(metrics["benchmarks"]) + 1), copy)
+
+MUTATIONS = [flip_coupling, drop_constraint_ids, retype_constraint, reorder_timestamps, detach_evidence,
+             toggle_spec_delta, toggle_first_red, toggle_final_green, perturb_benchmark, duplicate_benchmark]
+
+_SEEDS = []
+
+def _init_worker(seed_paths):
+    _SEEDS.clear()
+    for p in seed_paths:
+        record = validate.load_record(p)
+        if isinstance(record, dict):
+            _SEEDS.append((p.resolve(), pickle.dumps(record)))
+
+def fuzz_batch(task):
+    """Generate and check one batch of mutants; returns (count, failures)."""
+    run_seed, batch, size, max_mutations = task
+    rng = random.Random(run_seed * 1_000_003 + batch)
+    failures = {}
+    for _ in range(size):
+        seed_index = rng.randrange(len(_SEEDS))
+        path, blob = _SEEDS[seed_index]
+        mutant = pickle.loads(blob)
+        applied = [rng.choice(MUTATIONS) for _ in range(rng.randint(1, max_mutations))]
+        for mutate in applied:
+            mutate(mutant, rng)
+        missed, spurious = compare(mutant, path)
+        if missed or spurious:
+            # keep the first mutant per distinct failure; the rest add nothing after minimization
+            failures.setdefault((seed_index, missed, spurious), (mutant, [m.__name__ for m in applied]))
+    return size, [(key, mutant, ops) for key, (mutant, ops) in failures.items()]
+
+def leaf_diffs(base, mutant, path=()):
+    """Paths where mutant differs from base (lists of different length count as one leaf)."""
+    if isinstance(base, dict) and isinstance(mutant, dict):
+        out = []
+        for k in list(base) + [k for k in mutant if k not in base]:
+            if k not in base or k not in mutant:
+                out.append(path + (k,))
+            else:
+                out += leaf_diffs(base[k], mutant[k], path + (k,))
+        return out
+    if isinstance(base, list) and isinstance(mutant, list) and len(base) == len(mutant):
+        out = []
+        for i, (b, m) in enumerate(zip(base, mutant)):
+            out += leaf_diffs(b, m, path + (i,))
+        return out
+    return [] if base == mutant else [path]
+
+def revert(mutant, base, path):
+    """Copy of mutant with the value at path restored from base (or removed if base lacks it)."""
+    out = pickle.loads(pickle.dumps(mutant))
+    target, source = out, base
+    for key in path[:-1]:
+        target, source = target[key], source[key]
+    last = path[-1]
+    if isinstance(source, dict) and last not in source:
+        del target[last]
+    else:
+        target[last] = pickle.loads(pickle.dumps(source[last]))
+    return out
+
+def minimize(seed: dict, mutant: dict, record_path: Path, failure: tuple) -> dict:
+    """Revert differences from the seed while the same (missed, spurious) failure persists."""
+    current = mutant
+    progress = True
+    while progress:
+        progress = False
+        for path in leaf_diffs(seed, current):
+            candidate = revert(current, seed, path)
+            if compare(candidate, record_path) == failure:
+                current, progress = candidate, True
+                break
+    return current
+
+def rebase_evidence(record: dict, seed_path: Path, out_dir: Path) -> dict:
+    """Rewrite local evidence refs so they resolve the same way from out_dir."""
+    holders = _checks(record) + ([record["final_green"]] if isinstance(record.get("final_green"), dict) else [])
+    for holder in holders:
+        ref = holder.get("evidence_ref")
+        if isinstance(ref, str) and ref and "://" not in ref:
+            holder["evidence_ref"] = os.path.relpath(seed_path.parent / ref, out_dir)
+    return record
+
+def display_path(p: Path) -> str:
+    """p relative to the repo when it is inside it, else as given (seeds may come from anywhere)."""
+    try:
+        return str(p.relative_to(ROOT))
+    except ValueError:
+        return str(p)
+
+def save_attack(record: dict, seed_path: Path, missed: tuple, changed: list, out_dir: Path) -> Path:
+    yaml, _ = validate.yaml_loader()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    body = yaml.safe_dump(rebase_evidence(record, seed_path, out_dir.resolve()), sort_keys=False)
+    digest = hashlib.sha256(body.encode("utf-8")).hexdigest()[:10]
+    target = out_dir / f"attack-fuzz-{'-'.join(missed)}-{digest}.yaml"
+    header = (f"# Generated by tools/fuzz-attacks.py from {display_path(seed_path)}\n"
+              f"# Changed from seed: {', '.join(changed)}\n"
+              f"# Must fire: {', '.join(missed)} (missed by the validator when generated)\n")
+    target.write_text(header + body, encoding="utf-8")
+    return target
+
+def main():
+    ap = argparse.ArgumentParser(description="Fuzz the invariant rules with mutated attack records.")
+    ap.add_argument("seeds", nargs="*", type=Path, help="seed records (default: golden record + examples/attacks)")
+    ap.add_argument("--mutants", type=int, default=100_000)
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--seed", type=int, default=0, help="random seed (runs are reproducible per seed and jobs)")
+    ap.add_argument("--max-mutations", type=int, default=3, help="mutations stacked per mutant")
+    ap.add_argument("--out", type=Path, default=ROOT / "examples" / "attacks", help="where to save attack YAMLs")
+    ap.add_argument("--max-save", type=int, default=20)
+    ap.add_argument("--no-save", action="store_true", help="report failures without writing files")
+    args = ap.parse_args()
+
+    seed_paths = [p.resolve() for p in (args.seeds or DEFAULT_SEEDS)]
+    tasks = [(args.seed, b, min(BATCH, args.mutants - b * BATCH), args.max_mutations)
+             for b in range((args.mutants + BATCH - 1) // BATCH)]
+
+    started = time.perf_counter()
+    total, found = 0, {}
+    with multiprocessing.Pool(max(1, args.jobs), initializer=_init_worker, initargs=(seed_paths,)) as pool:
+        for count, failures in pool.imap_unordered(fuzz_batch, tasks):
+            total += count
+            for key, mutant, ops in failures:
+                found.setdefault(key, (mutant, ops))
+    elapsed = time.perf_counter() - started
+    print(f"{total} mutants from {len(seed_paths)} seeds in {elapsed:.2f} s "
+          f"({total / elapsed:,.0f}/s on {args.jobs} workers)")
+
+    if not found:
+        print("No disagreements between the validator and the oracle")
+        return 0
+
+    _init_worker(seed_paths)
+    seeds = {i: (p, pickle.loads(blob)) for i, (p, blob) in enumerate(_SEEDS)}
+    saved = 0
+    print(f"\n{len(found)} distinct failures")
+    for (seed_index, missed, spurious), (mutant, ops) in sorted(found.items(), key=lambda kv: kv[0]):
+        seed_path, seed = seeds[seed_index]
+        small = minimize(seed, mutant, seed_path, (missed, spurious))
+        diffs = [".".join(str(k) for k in path) for path in leaf_diffs(seed, small)]
+        print(f"- {display_path(seed_path)}: missed {list(missed)}, spurious {list(spurious)}; "
+              f"changed {diffs}")
+        if missed and not args.no_save and saved < args.max_save:
+            print(f"  saved {save_attack(small, seed_path, missed, diffs, args.out)}")
+            saved += 1
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Measure FinalGreen by running the record's check suite
+
+Runs a WorkUnit's `check_suite.run_command` in the record's directory (the
+pack directory), streams its output into the FinalGreen evidence file, and
+writes the measured results back into the record (in a YAML record only
+these fields are edited, so its comments and layout are kept):
+
+  final_green.all_checks_passed         exit status and parsed failures
+  final_green.run_id                    run-<start time, UTC>
+  final_green.evidence_ref / _sha256    the captured output
+  final_green.summary_metrics           duration_seconds (wall), cpu_seconds,
+                                        checks_executed
+
+Test counts come from pytest's summary line, unittest's "Ran N tests",
+[PASS]/[FAIL] lines, or JUnit XML (--junit, pytest only). With --shards N a
+pytest suite is split across N concurrent processes.
+
+Usage:
+  python3 tools/measure-green.py challenge-packs/pack-0002-incidental-red/workunit.yaml
+  python3 tools/measure-green.py workunit.yaml --command "python -m pytest -q tests" --junit
+  python3 tools/measure-green.py workunit.yaml --shards 4 --dry-run
+
+Exits 0 when the checks passed and the updated record validates, 1 otherwise.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import resource
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import validate  # noqa: E402
+
+# pytest options that take a separate value, so the value is not mistaken for a test path
+PYTEST_VALUE_OPTIONS = {"-c", "-k", "-m", "-p", "-o", "-r", "-W", "--rootdir", "--confcutdir", "--basetemp",
+                        "--junitxml", "--junit-xml", "--deselect", "--ignore", "--ignore-glob", "--maxfail",
+                        "--tb", "--durations", "--override-ini", "--log-level", "--cov", "--cov-report"}
+VERBOSITY = re.compile(r"^(-[qv]+|--quiet|--verbose)$")
+PYTEST_COUNT = re.compile(r"(\d+) (passed|failed|errors?|skipped|xfailed|xpassed)")
+UNITTEST_RAN = re.compile(r"^Ran (\d+) tests?", re.M)
+
+def is_pytest(command: str) -> bool:
+    words = shlex.split(command)
+    return bool(words) and (Path(words[0]).name == "pytest" or words[1:3] == ["-m", "pytest"])
+
+def parse_counts(output: str) -> dict:
+    """{"passed", "failed", "skipped"} from a pytest summary, unittest footer or [PASS]/[FAIL] lines."""
+    summary = [line for line in output.splitlines() if PYTEST_COUNT.search(line) and " in " in line]
+    if summary:
+        counts = {"passed": 0, "failed": 0, "skipped": 0}
+        for n, kind in PYTEST_COUNT.findall(summary[-1]):
+            key = {"xpassed": "passed", "xfailed": "skipped", "error": "failed", "errors": "failed"}.get(kind, kind)
+            counts[key] += int(n)
+        return counts
+    ran = UNITTEST_RAN.findall(output)
+    if ran:
+        failed = re.search(r"FAILED \((?:failures|errors)=(\d+)(?:, (?:failures|errors)=(\d+))?", output)
+        nfailed = sum(int(x) for x in failed.groups() if x) if failed else 0
+        return {"passed": int(ran[-1]) - nfailed, "failed": nfailed, "skipped": 0}
+    passed = len(re.findall(r"^\[PASS\]", output, re.M))
+    failed = len(re.findall(r"^\[FAIL\]", output, re.M))
+    if passed or failed:
+        return {"passed": passed, "failed": failed, "skipped": 0}
+    return {}
+
+def parse_junit(paths: list) -> dict:
+    """Totals over JUnit XML files (testsuite or testsuites roots)."""
+    import xml.etree.ElementTree as ET
+
+    counts = {"passed": 0, "failed": 0, "skipped": 0}
+    for p in paths:
+        root = ET.parse(p).getroot()
+        suites = [root] if root.tag == "testsuite" else root.iter("testsuite")
+        for suite in suites:
+            tests = int(suite.get("tests", 0))
+            failed = int(suite.get("failures", 0)) + int(suite.get("errors", 0))
+            skipped = int(suite.get("skipped", 0))
+            counts["passed"] += tests - failed - skipped
+            counts["failed"] += failed
+            counts["skipped"] += skipped
+    return counts
+
+def split_pytest(command: str, cwd: Path) -> tuple:
+    """(words without positional test paths, test paths) of a pytest command."""
+    words = shlex.split(command)
+    start = 1 if Path(words[0]).name == "pytest" else 3
+    options, paths = words[:start], []
+    takes_value = False
+    for word in words[start:]:
+        if not takes_value and not word.startswith("-") and ("::" in word or (cwd / word).exists()):
+            paths.append(word)
+        else:
+            options.append(word)
+        takes_value = not takes_value and word in PYTEST_VALUE_OPTIONS
+    return options, paths
+
+def collect_pytest(command: str, cwd: Path) -> list:
+    """Test node ids the pytest command would run."""
+    # The user's own -q/-v would change --collect-only's output from node ids to per-file counts or a tree.
+    words = [w for w in shlex.split(command) if not VERBOSITY.match(w)]
+    out = subprocess.run(shlex.join(words + ["--collect-only", "-q"]), shell=True, cwd=cwd,
+                         capture_output=True, text=True)
+    return [line.strip() for line in out.stdout.splitlines() if "::" in line]
+
+def shard_commands(command: str, cwd: Path, shards: int) -> list:
+    """One command per shard, each running a share of the collected node ids instead of the original test paths."""
+    tests = collect_pytest(command, cwd)
+    if len(tests) < 2:
+        return [command]
+    options, _ = split_pytest(command, cwd)
+    groups = [tests[i::shards] for i in range(shards)]
+    return [shlex.join(options + g) for g in groups if g]
+
+def dump_record(record: dict, record_path: Path, yaml) -> str:
+    if record_path.suffix.lower() == ".json":
+        return json.dumps(record, indent=2) + "\n"
+    return yaml.safe_dump(record, sort_keys=False)
+
+YAML_KEY = re.compile(r"^( *)([A-Za-z_][\w-]*):(?:[ \t]+(?!#)(.*?))?([ \t]+#.*)?$")
+
+def _yaml_scalar(value, yaml) -> str:
+    text = yaml.safe_dump(value, default_flow_style=True, width=1 << 16)
+    return text[:-len("\n...\n")] if text.endswith("\n...\n") else text.rstrip("\n")
+
+def _set_yaml_block(lines: list, start: int, end: int, indent: int, values: dict, yaml) -> int:
+    """
+    Set values in the block-style mapping lines[start:end] whose keys sit at
+    indent, editing lines in place and appending missing keys; returns the
+    block's new end.
+    """
+    for key, value in values.items():
+        at = None
+        for i in range(start, end):
+            m = YAML_KEY.match(lines[i])
+            if m and len(m.group(1)) == indent and m.group(2) == key:
+                at = m
+                break
+        if at is None:
+            body = [f"{' ' * indent}{key}:"]
+            if isinstance(value, dict):
+                body += [f"{' ' * (indent + 2)}{k}: {_yaml_scalar(v, yaml)}" for k, v in value.items()]
+            else:
+                body[0] += f" {_yaml_scalar(value, yaml)}"
+            while end > start and not lines[end - 1].strip():
+                end -= 1
+            lines[end:end] = body
+            end += len(body)
+            continue
+        sub_end = i + 1
+        while sub_end < len(lines) and (not lines[sub_end].strip() or lines[sub_end].lstrip().startswith("#")
+                                        or len(lines[sub_end]) - len(lines[sub_end].lstrip(" ")) > indent):
+            sub_end += 1
+        comment = at.group(4) or ""
+        if isinstance(value, dict) and not at.group(3):
+            child = next((len(line) - len(line.lstrip(" ")) for line in lines[i + 1:sub_end]
+                          if line.strip() and not line.lstrip().startswith("#")), indent + 2)
+            end += _set_yaml_block(lines, i + 1, sub_end, child, value, yaml) - sub_end
+        elif isinstance(value, dict):  # a flow mapping on one line: rewrite it as a block
+            body = [f"{' ' * indent}{key}:{comment}"]
+            body += [f"{' ' * (indent + 2)}{k}: {_yaml_scalar(v, yaml)}" for k, v in value.items()]
+            lines[i:i + 1] = body
+            end += len(body) - 1
+        else:
+            lines[i] = f"{' ' * indent}{key}: {_yaml_scalar(value, yaml)}{comment}"
+    return end
+
+def update_yaml_section(text: str, section: str, values: dict, yaml) -> str | None:
+    """
+    text with the top-level block mapping `section` updated from values
+    (nested dicts are merged key by key), keeping comments and key order;
+    None when the section is not a block mapping this can edit.
+    """
+    lines = text.splitlines()
+    starts = [i for i, line in enumerate(lines) if YAML_KEY.match(line) and line.startswith(f"{section}:")]
+    if len(starts) != 1 or YAML_KEY.match(lines[starts[0]]).group(3):
+        return None
+    start = starts[0] + 1
+    end = start
+    while end < len(lines) and (not lines[end].strip() or lines[end][0] in " #"):
+        end += 1
+    indent = next((len(line) - len(line.lstrip(" ")) for line in lines[start:end]
+                   if line.strip() and not line.lstrip().startswith("#")), 2)
+    _set_yaml_block(lines, start, end, indent, values, yaml)
+    return "\n".join(lines) + "\n"
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def run_suite(commands: list, cwd: Path, evidence: Path, timeout: float = None) -> tuple:
+    """
+    Run commands concurrently, each streaming into its own part of the
+    evidence file; returns (returncodes, wall_seconds, cpu_seconds, output).
+    """
+    evidence.parent.mkdir(parents=True, exist_ok=True)
+    parts = [evidence.with_name(f".{evidence.name}.{i}.part") for i in range(len(commands))]
+    cpu_before = children_cpu()
+    started = time.perf_counter()
+    procs = []
+    for command, part in zip(commands, parts):
+        with open(part, "wb") as out:
+            procs.append(subprocess.Popen(command, shell=True, cwd=cwd, stdout=out, stderr=subprocess.STDOUT,
+                                          start_new_session=True))
+    deadline = None if timeout is None else started + timeout  # one budget for the whole suite, not per shard
+    codes = []
+    for proc in procs:
+        try:
+            codes.append(proc.wait(timeout=None if deadline is None else max(0.0, deadline - time.perf_counter())))
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass  # the group exited between the timeout and the kill
+            codes.append(proc.wait())
+    wall = time.perf_counter() - started
+    cpu = children_cpu() - cpu_before
+
+    with open(evidence, "wb") as out:
+        for i, (command, part) in enumerate(zip(commands, parts)):
+            if len(commands) > 1:
+                out.write(f"=== shard {i + 1}/{len(commands)}: {command}\n".encode("utf-8"))
+            out.write(part.read_bytes())
+            part.unlink()
+    return codes, wall, cpu, evidence.read_text(encoding="utf-8", errors="replace")
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a WorkUnit's check suite and record FinalGreen from it.")
+    ap.add_argument("workunit", type=Path)
+    ap.add_argument("--command", help="override check_suite.run_command")
+    ap.add_argument("--cwd", type=Path, help="working directory (default: the record's directory)")
+    ap.add_argument("--evidence", help="evidence path relative to the record (default: final_green.evidence_ref)")
+    ap.add_argument("--junit", action="store_true", help="count tests from pytest JUnit XML")
+    ap.add_argument("--shards", type=int, default=1, help="split a pytest suite across N processes")
+    ap.add_argument("--timeout", type=float, default=None, help="kill the suite after this many seconds")
+    ap.add_argument("--dry-run", action="store_true", help="print the measurements without rewriting the record or its evidence")
+    args = ap.parse_args()
+
+    yaml, loader = validate.yaml_loader()
+    record_path = args.workunit.resolve()
+    record = validate.load_record(record_path)
+    green = record.setdefault("final_green", {})
+    command = args.command or record.get("check_suite", {}).get("run_command")
+    if not command:
+        raise SystemExit("No check_suite.run_command in the record; pass --command")
+    cwd = (args.cwd or record_path.parent).resolve()
+    evidence_ref = args.evidence or green.get("evidence_ref") or "evidence/final_green.txt"
+    evidence = (record_path.parent / evidence_ref).resolve()
+    if (args.junit or args.shards > 1) and not is_pytest(command):
+        raise SystemExit("--junit and --shards need a pytest command; pass --command 'python -m pytest ...'")
+
+    commands = shard_commands(command, cwd, args.shards) if args.shards > 1 else [command]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        junit_files = []
+        if args.junit:
+            junit_files = [Path(tmp) / f"junit-{i}.xml" for i in range(len(commands))]
+            commands = [f"{c} --junitxml={shlex.quote(str(j))}" for c, j in zip(commands, junit_files)]
+        run_start = datetime.now(timezone.utc)
+        # A dry run leaves the recorded evidence file alone.
+        output_path = Path(tmp) / evidence.name if args.dry_run else evidence
+        codes, wall, cpu, output = run_suite(commands, cwd, output_path, args.timeout)
+        evidence_sha256 = hashlib.sha256(output_path.read_bytes()).hexdigest()
+        counts = parse_junit([j for j in junit_files if j.exists()]) if args.junit else {}
+    if not counts:
+        counts = {"passed": 0, "failed": 0, "skipped": 0}
+        for part in output.split("=== shard ") if len(commands) > 1 else [output]:
+            for key, n in parse_counts(part).items():
+                counts[key] += n
+
+    executed = counts["passed"] + counts["failed"]
+    passed = all(code == 0 for code in codes) and counts["failed"] == 0
+    metrics = dict(green.get("summary_metrics") or {})
+    metrics["duration_seconds"] = round(wall, 3)
+    metrics["cpu_seconds"] = round(cpu, 3)
+    if executed:
+        metrics["checks_executed"] = executed
+    else:
+        print("WARNING: could not count executed checks; keeping the recorded checks_executed", file=sys.stderr)
+
+    green.update({
+        "all_checks_passed": passed,
+        "run_id": "run-" + run_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "evidence_ref": evidence_ref,
+        "evidence_sha256": evidence_sha256,
+        "summary_metrics": metrics,
+    })
+    print(f"{'PASSED' if passed else 'FAILED'}: {counts['passed']} passed, {counts['failed']} failed, "
+          f"{counts['skipped']} skipped in {wall:.3f} s wall / {cpu:.3f} s CPU "
+          f"({len(commands)} process{'es' if len(commands) > 1 else ''})")
+    print(f"Evidence: {evidence}" + (" (dry run: not written)" if args.dry_run else ""))
+
+    if args.dry_run:
+        print(yaml.safe_dump({"final_green": green}, sort_keys=False), end="")
+        return 0 if passed else 1
+
+    text = None
+    if record_path.suffix.lower() != ".json":
+        # Edit only the measured fields, so the record's comments and layout survive.
+        text = update_yaml_section(record_path.read_text(encoding="utf-8"), "final_green", {
+            key: green[key] for key in ("all_checks_passed", "run_id", "evidence_ref", "evidence_sha256",
+                                        "summary_metrics")}, yaml)
+        if text is not None and validate.parse_record(text, record_path.suffix) != record:
+            text = None
+        if text is None:
+            print("WARNING: final_green is not a plain block mapping; rewriting the whole record "
+                  "(comments are not kept)", file=sys.stderr)
+    tmp = record_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(text if text is not None else dump_record(record, record_path, yaml), encoding="utf-8")
+    os.replace(tmp, record_path)
+    print(f"Updated {record_path}")
+
+    validator = validate.compile_schema(validate.load_schema(validate.default_schema_path()))
+    result = validate.validate_path(record_path, validator)
+    validate.print_single(result)
+    return 0 if passed and not result["errors"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,23 +4,44 @@ Challenge Pack Runner
 
 Discovers all challenge packs, runs validator on each, compares to expected outcomes,
 and generates a pass/fail report.
+
+The validator is imported in-process (no interpreter per pack), the schema is
+compiled once per worker, and packs are validated concurrently:
+
+  python3 tools/pack-runner.py --jobs 4
+  python3 tools/pack-runner.py --no-cache
+  python3 tools/pack-runner.py --timings   # per-phase / per-rule time across packs
+
+Unchanged packs reuse cached results (see tools/validation_cache.py).
+
+Watch mode polls challenge-packs/, examples/attacks/ and the schema, and
+after each (debounced) burst of edits revalidates only the packs and attack
+records whose files or evidence changed. A schema change revalidates
+everything. Attack records are expected to be INVALID.
+
+  python3 tools/pack-runner.py --watch
 """
 
-import json
-import subprocess
+import argparse
+import os
 import sys
+import time
+from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import validate  # noqa: E402
+
 def find_packs(packs_dir: Path):
     """Find all pack directories (pack-XXXX format)."""
-    return [d for d in packs_dir.iterdir() if d.is_dir() and d.name.startswith("pack-")]
+    return sorted(d for d in packs_dir.iterdir() if d.is_dir() and d.name.startswith("pack-"))
 
 def get_expected_outcome(pack_dir: Path) -> str:
     """Read expected.md to determine if pack should be VALID or INVALID."""
     expected_file = pack_dir / "expected.md"
     if not expected_file.exists():
         return "UNKNOWN"
-    
+
     content = expected_file.read_text().upper()
     if "INVALID" in content:
         return "INVALID"
@@ -28,87 +49,246 @@ def get_expected_outcome(pack_dir: Path) -> str:
         return "VALID"
     return "UNKNOWN"
 
-def run_validator(workunit_path: Path) -> str:
-    """Run the validator and return VALID, INVALID, or ERROR."""
+def outcome(result: dict) -> str:
+    """Map a validate.validate_path() result to VALID or INVALID."""
+    return "INVALID" if result["errors"] else "VALID"
+
+def run_validators(workunit_paths: list, jobs: int, cache_dir: Path = None, raw: list = None) -> list:
+    """
+    Validate many workunits concurrently; returns (actual, seconds, cached) per
+    path, in order. If raw is a list, the full validate_path() results are appended to it.
+    """
     try:
-        result = subprocess.run(
-            [sys.executable, "tools/validate.py", str(workunit_path)],
-            capture_output=True,
-            text=True,
-            cwd=Path(__file__).parent.parent
-        )
-        if result.returncode == 0:
-            return "VALID"
-        elif result.returncode == 1:
-            return "INVALID"
-        else:
-            return f"ERROR: {result.stderr.strip()}"
+        results = list(validate.validate_many(workunit_paths, validate.default_schema_path(), jobs=jobs,
+                                              cache_dir=cache_dir))
+        if raw is not None:
+            raw.extend(results)
+        return [(outcome(r), r["seconds"], bool(r.get("cached"))) for r in results]
     except Exception as e:
-        return f"ERROR: {str(e)}"
+        return [(f"ERROR: {str(e)}", 0.0, False) for _ in workunit_paths]
 
 def generate_report(results: list) -> str:
     """Generate a formatted report."""
     report = ["# Challenge Pack Runner Report", ""]
-    
+
     passed = 0
     total = len(results)
-    
-    for pack_name, expected, actual, status in results:
+
+    for pack_name, expected, actual, status, seconds, cached in results:
         if status == "PASS":
             passed += 1
         report.append(f"## {pack_name}")
         report.append(f"- Expected: {expected}")
         report.append(f"- Actual: {actual}")
         report.append(f"- Status: {status}")
+        report.append(f"- Wall time: {seconds * 1000:.1f} ms" + (" (cached result)" if cached else ""))
         report.append("")
-    
+
     report.append("## Summary")
     report.append(f"- Passed: {passed}/{total}")
     report.append(f"- Failed: {total - passed}/{total}")
-    
+
+    # A cache hit's time is a lookup, not validation, so only fresh runs say which packs are slow.
+    validated = [r for r in results if not r[5]]
+    if results:
+        report.append(f"- Cache hits: {total - len(validated)}/{total}")
+    if validated:
+        slowest = max(validated, key=lambda r: r[4])
+        report.append(f"- Validation time: {sum(r[4] for r in validated) * 1000:.1f} ms "
+                      f"({len(validated)} pack{'s' if len(validated) != 1 else ''} validated)")
+        report.append(f"- Slowest pack: {slowest[0]} ({slowest[4] * 1000:.1f} ms)")
+    elif results:
+        report.append("- Validation time: n/a (all results cached; run with --no-cache to time packs)")
+
     if passed == total:
         report.append("- Overall: SUCCESS")
     else:
         report.append("- Overall: FAILURE")
-    
+
     return "\n".join(report)
 
+def timings_report(raw: list) -> str:
+    """Per-phase and per-rule time summed over all validated packs."""
+    agg = validate.aggregate_timings(raw)
+    lines = ["", "## Timings", f"- Records: {agg['records']} ({agg['cached']} from cache)"]
+    for group in ("phases", "rules"):
+        for name, t in sorted(agg[group].items(), key=lambda kv: -kv[1]["wall_ms"]):
+            lines.append(f"- {group[:-1]} {name}: wall {t['wall_ms']:.3f} ms, cpu {t['cpu_ms']:.3f} ms")
+    return "\n".join(lines)
+
+def watch_units(repo_root: Path) -> dict:
+    """Everything watch mode checks: name -> (workunit path, expected outcome, pack dir or None)."""
+    units = {}
+    packs_dir = repo_root / "challenge-packs"
+    if packs_dir.exists():
+        for pack_dir in find_packs(packs_dir):
+            units[pack_dir.name] = (pack_dir / "workunit.yaml", get_expected_outcome(pack_dir), pack_dir)
+    attacks_dir = repo_root / "examples" / "attacks"
+    if attacks_dir.exists():
+        for record in sorted(attacks_dir.iterdir()):
+            if record.suffix in validate.RECORD_SUFFIXES:
+                units[f"attacks/{record.name}"] = (record, "INVALID", None)
+    return units
+
+def unit_files(unit: tuple) -> set:
+    """Files whose change should revalidate a unit: its pack directory or record, plus evidence."""
+    record_path, _, pack_dir = unit
+    files = {f.resolve() for f in pack_dir.rglob("*") if f.is_file()} if pack_dir else set()
+    files.add(record_path.resolve())
+    try:
+        record = validate.load_record(record_path)
+        if isinstance(record, dict):
+            files.update(validate.evidence_paths(record, record_path.resolve()))
+    except Exception:
+        pass  # unreadable records are reported by the validator; their evidence is unknown
+    return files
+
+def snapshot(roots: list, extra: set) -> dict:
+    """(mtime_ns, size) for every file under roots and for each extra path (None if missing)."""
+    snap = {}
+    for root in roots:
+        if root.is_file():
+            snap[root.resolve()] = None
+        elif root.is_dir():
+            for f in root.rglob("*"):
+                if f.is_file():
+                    snap[f.resolve()] = None
+    for f in set(snap) | extra:
+        try:
+            st = f.stat()
+            snap[f] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            snap[f] = None
+    return snap
+
+def watch(repo_root: Path, jobs: int, cache_dir: Path = None, interval: float = 0.5,
+          debounce: float = 0.3) -> int:
+    """Revalidate changed packs and attack records until interrupted, printing pass/fail deltas."""
+    schema_path = validate.default_schema_path().resolve()
+    roots = [repo_root / "challenge-packs", repo_root / "examples" / "attacks", schema_path]
+    status = {}
+    depends = {}
+    units = {}
+    snap = {}
+    dirty = True  # revalidate everything on the next pass
+
+    def check(names: list) -> None:
+        validate.EVIDENCE.reset_stats()
+        runnable = [n for n in names if units[n][0].exists()]
+        measured = dict(zip(runnable, run_validators([units[n][0] for n in runnable], jobs, cache_dir)))
+        stamp = datetime.now().strftime("%H:%M:%S")
+        print(f"\n[{stamp}] revalidated {len(names)} of {len(units)}")
+        for name in names:
+            actual, seconds, cached = measured.get(name, ("ERROR: workunit.yaml not found", 0.0, False))
+            expected = units[name][1]
+            new = "UNKNOWN" if expected == "UNKNOWN" else ("PASS" if actual == expected else "FAIL")
+            old = status.get(name)
+            status[name] = new
+            depends[name] = unit_files(units[name])
+            change = "new" if old is None else (f"{old} -> {new}" if old != new else f"still {new}")
+            timing = "cached" if cached else f"{seconds * 1000:.1f} ms"
+            print(f"  {name}: {change} (expected {expected}, got {actual}, {timing})")
+        passed = sum(1 for v in status.values() if v == "PASS")
+        print(f"  Passing: {passed}/{len(status)}", flush=True)
+
+    print(f"Watching {', '.join(str(r.relative_to(repo_root)) for r in roots)} (Ctrl-C to stop)")
+    try:
+        while True:
+            if dirty:
+                units = watch_units(repo_root)
+                check(list(units))
+                snap = snapshot(roots, set().union(*depends.values()))
+                dirty = False
+            time.sleep(interval)
+            extra = set().union(*depends.values())
+            current = snapshot(roots, extra)
+            if current == snap:
+                continue
+            while True:  # debounce: wait for the burst of writes to settle
+                time.sleep(debounce)
+                settled = snapshot(roots, extra)
+                if settled == current:
+                    break
+                current = settled
+            changed = {f for f in set(current) | set(snap) if current.get(f) != snap.get(f)}
+            snap = current
+            if schema_path in changed:
+                print("\nSchema changed: revalidating everything")
+                dirty = True
+                continue
+            units = watch_units(repo_root)
+            for gone in sorted(set(status) - set(units)):
+                print(f"\n  {gone}: removed")
+                status.pop(gone)
+                depends.pop(gone, None)
+            names = [n for n in units if n not in status or depends.get(n, set()) & changed
+                     or (units[n][2] is not None and any(units[n][2].resolve() in f.parents for f in changed))]
+            if names:
+                check(names)
+                snap = snapshot(roots, set().union(*depends.values()))
+    except KeyboardInterrupt:
+        passed = sum(1 for v in status.values() if v == "PASS")
+        print(f"\nStopped. Passing: {passed}/{len(status)}")
+        return 0 if passed == len(status) else 1
+
 def main():
-    repo_root = Path(__file__).parent.parent
+    ap = argparse.ArgumentParser(description="Validate every challenge pack and compare against expected.md.")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                    help="packs validated concurrently (default: CPU count)")
+    ap.add_argument("--no-cache", action="store_true", help="revalidate every pack, ignoring cached results")
+    ap.add_argument("--timings", action="store_true", help="append per-phase and per-rule validation time")
+    ap.add_argument("--watch", action="store_true",
+                    help="keep running and revalidate packs and attack records as their files change")
+    ap.add_argument("--interval", type=float, default=0.5, help="watch mode poll interval in seconds")
+    args = ap.parse_args()
+
+    repo_root = Path(__file__).resolve().parent.parent
     packs_dir = repo_root / "challenge-packs"
-    
+
     if not packs_dir.exists():
         print("ERROR: challenge-packs directory not found")
         return 1
-    
+
     packs = find_packs(packs_dir)
     if not packs:
         print("ERROR: No challenge packs found")
         return 1
-    
+
+    from validation_cache import DEFAULT_CACHE_DIR
+
+    cache_dir = None if args.no_cache else DEFAULT_CACHE_DIR
+    if args.watch:
+        return watch(repo_root, args.jobs, cache_dir, args.interval)
+
+    runnable = [p for p in packs if (p / "workunit.yaml").exists()]
+    raw = []
+    measured = dict(zip(runnable, run_validators([p / "workunit.yaml" for p in runnable], args.jobs, cache_dir, raw)))
+
     results = []
     for pack_dir in packs:
         pack_name = pack_dir.name
-        workunit_path = pack_dir / "workunit.yaml"
         expected = get_expected_outcome(pack_dir)
-        
-        if not workunit_path.exists():
+
+        if pack_dir not in measured:
             actual = "ERROR: workunit.yaml not found"
             status = "FAIL"
+            seconds, cached = 0.0, False
         else:
-            actual = run_validator(workunit_path)
+            actual, seconds, cached = measured[pack_dir]
             if expected == "UNKNOWN":
                 status = "UNKNOWN"
             elif actual == expected:
                 status = "PASS"
             else:
                 status = "FAIL"
-        
-        results.append((pack_name, expected, actual, status))
-    
+
+        results.append((pack_name, expected, actual, status, seconds, cached))
+
     report = generate_report(results)
     print(report)
-    
+    if args.timings:
+        print(timings_report(raw))
+
     # Exit with 0 if all passed, 1 if any failed
     all_passed = all(r[3] == "PASS" for r in results)
     return 0 if all_passed else 1
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Static HTML report over the audit corpus
+
+Pre-renders one page per record (validity and findings, MiniSpec, FirstRed,
+DiffSet, FinalGreen, SpecDelta, with links to evidence), plus index pages:
+all records by work_id, by agent, by constraint type, by validity, and the
+challenge packs against their expected.md.
+
+Regeneration is incremental. .manifest.json in the output directory records,
+for every source file, its stat, the stat of every evidence file its records
+reference (and of a challenge pack's expected.md), and the index rows of its
+pages. A source is re-rendered only if
+one of those changed, or if this generator, the validator or the schema did.
+Stale sources are rendered in parallel (-j). Index pages are rebuilt from the
+manifest rows. Any page whose bytes are unchanged is not rewritten.
+
+Usage:
+  python3 tools/report-site.py                                # examples/ + challenge packs -> site/report/
+  python3 tools/report-site.py -j 8 agent-logs/ --out /tmp/report
+  python3 tools/report-site.py --force                        # re-render everything
+"""
+
+import argparse
+import hashlib
+import html
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+import validate  # noqa: E402
+
+DEFAULT_OUT = ROOT / "site" / "report"
+DEFAULT_INPUTS = [str(ROOT / "examples"), str(ROOT / "challenge-packs" / "*" / "workunit.yaml")]
+MANIFEST = ".manifest.json"
+MAX_FILES_LISTED = 500
+
+STYLE = """
+body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 24px; line-height: 1.4; }
+.box { border: 1px solid #ddd; border-radius: 10px; padding: 16px; margin: 16px 0; }
+.muted { color: #666; }
+code { font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, monospace; }
+.pill { display: inline-block; padding: 2px 10px; border: 1px solid #ccc; border-radius: 999px; font-size: 12px; margin-left: 8px; }
+.ok { border-color: #9ad29a; }
+.bad { border-color: #e3a2a2; }
+table { border-collapse: collapse; width: 100%; }
+th, td { text-align: left; padding: 4px 8px; border-bottom: 1px solid #eee; vertical-align: top; }
+nav a { margin-right: 12px; }
+"""
+
+INDEXES = [("index.html", "All records"), ("agents.html", "By agent"), ("types.html", "By constraint type"),
+           ("validity.html", "By validity"), ("packs.html", "Challenge packs")]
+
+def e(value) -> str:
+    return html.escape("" if value is None else str(value))
+
+def pill(text: str, ok: bool) -> str:
+    return f'<span class="pill {"ok" if ok else "bad"}">{e(text)}</span>'
+
+def page(title: str, body: str, depth: int = 0) -> str:
+    up = "../" * depth
+    nav = "".join(f'<a href="{up}{name}">{e(label)}</a>' for name, label in INDEXES)
+    return (f'<!doctype html>\n<html lang="en">\n<head>\n<meta charset="utf-8" />\n'
+            f'<meta name="viewport" content="width=device-width,initial-scale=1" />\n'
+            f"<title>{e(title)}</title>\n<style>{STYLE}</style>\n</head>\n<body>\n"
+            f"<nav>{nav}</nav>\n<h1>{e(title)}</h1>\n{body}\n</body>\n</html>\n")
+
+def write_if_changed(path: Path, text: str) -> bool:
+    data = text.encode("utf-8")
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+def generator_version() -> str:
+    """This file, the validator and the schema: a change to any of them re-renders every page."""
+    h = hashlib.sha256(Path(__file__).read_bytes())
+    h.update(validate.validator_version().encode())
+    h.update(validate.default_schema_path().read_bytes())
+    return h.hexdigest()[:16]
+
+_PACK_RUNNER = None
+
+def expected_file(record_path: Path):
+    """A challenge pack's expected.md for its workunit.yaml, else None."""
+    pack_dir = record_path.parent
+    if pack_dir.parent.name != "challenge-packs" or not pack_dir.name.startswith("pack-"):
+        return None
+    return pack_dir / "expected.md"
+
+def expected_outcome(record_path: Path):
+    """expected.md verdict for a challenge pack's workunit.yaml (via pack-runner.py), else None."""
+    global _PACK_RUNNER
+    if expected_file(record_path) is None:
+        return None
+    if _PACK_RUNNER is None:
+        spec = importlib.util.spec_from_file_location("pack_runner", ROOT / "tools" / "pack-runner.py")
+        _PACK_RUNNER = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_PACK_RUNNER)
+    return _PACK_RUNNER.get_expected_outcome(record_path.parent)
+
+def page_name(rel: str, n: int, count: int) -> str:
+    # The slug alone is ambiguous (a/b.yaml and a_b.yaml), so a short hash of the path follows it.
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", rel).strip("_")
+    tag = hashlib.sha256(rel.encode("utf-8")).hexdigest()[:8]
+    return f"records/{slug}-{tag}--{n}.html" if count > 1 else f"records/{slug}-{tag}.html"
+
+def _stat(p: Path):
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def evidence_link(ref, record_path: Path, page_dir: Path) -> str:
+    if not isinstance(ref, str) or not ref:
+        return '<span class="muted">(none)</span>'
+    # Refs are agent-written: only http(s) URLs and local files become links, never other schemes.
+    if ref.lower().startswith(("http://", "https://")):
+        return f'<a href="{e(ref)}">{e(ref)}</a>'
+    if "://" in ref or ref.startswith(validate.STORE_REF_PREFIX):
+        return f"<code>{e(ref)}</code>"
+    target = Path(os.path.relpath((record_path.parent / ref).resolve(), page_dir)).as_posix()
+    if ":" in target.split("/", 1)[0]:
+        target = "./" + target  # a first segment like "javascript:x" would otherwise read as a scheme
+    return f'<a href="{e(target)}"><code>{e(ref)}</code></a>'
+
+def render_record(record: dict, record_path: Path, location: str, rel: str, result: dict,
+                  page_dir: Path, expected) -> str:
+    sec = {key: record.get(key) if isinstance(record.get(key), dict) else {}
+           for key in ("actor", "mini_spec", "check_suite", "first_red", "diff_set", "final_green", "spec_delta")}
+    valid = not result["errors"]
+    parts = [f'<div class="box"><div>WorkUnit <code>{e(record.get("work_id", "(missing)"))}</code>'
+             f'{pill("VALID" if valid else "INVALID", valid)}'
+             + (pill(f"expected {expected}", expected == ("VALID" if valid else "INVALID")) if expected else "")
+             + f'</div><div class="muted">Repo: {e(record.get("repo_ref"))} &bull; Time: {e(record.get("timestamp_utc"))}'
+             f' &bull; Agent: {e(sec["actor"].get("agent"))} &bull; Human: {e(sec["actor"].get("human"))}</div>'
+             f'<div class="muted">Source: <code>{e(rel)}</code> ({e(location)})</div></div>']
+    if result["errors"] or result["warnings"]:
+        items = "".join(f"<li>{e(m)}</li>" for m in result["errors"])
+        items += "".join(f'<li class="muted">warning: {e(m)}</li>' for m in result["warnings"])
+        parts.append(f'<div class="box"><h2>Findings</h2><ul>{items}</ul></div>')
+
+    rows = "".join(f"<tr><td><code>{e(c.get('id'))}</code></td><td>{e(c.get('statement'))}</td>"
+                   f"<td>{pill(c.get('type') or 'untyped', bool(c.get('type')))}</td></tr>"
+                   for c in validate._items(sec["mini_spec"].get("constraints")))
+    parts.append(f'<div class="box"><h2>MiniSpec</h2><div class="muted">{e(sec["mini_spec"].get("summary"))}</div>'
+                 f"<table><tr><th>Id</th><th>Statement</th><th>Type</th></tr>{rows}</table></div>")
+    cs = sec["check_suite"]
+    parts.append(f'<div class="box"><h2>CheckSuite</h2><div>Location: <code>{e(cs.get("location"))}</code></div>'
+                 f'<div>Run: <code>{e(cs.get("run_command"))}</code></div>'
+                 f'<div class="muted">Env: {e(cs.get("environment"))}</div></div>')
+
+    red = sec["first_red"]
+    rows = "".join(f"<tr><td><code>{e(fc.get('check_id'))}</code></td>"
+                   f"<td>{e(', '.join(map(str, fc.get('constraint_ids') or [])))}</td>"
+                   f"<td>{pill(fc.get('coupling') or '?', fc.get('coupling') == 'direct')}</td>"
+                   f"<td>{evidence_link(fc.get('evidence_ref'), record_path, page_dir)}</td></tr>"
+                   for fc in validate._items(red.get("failing_checks")))
+    parts.append(f'<div class="box"><h2>FirstRed {pill("occurred" if red.get("occurred") is True else "no red", red.get("occurred") is True)}</h2>'
+                 f"<table><tr><th>Check</th><th>Constraints</th><th>Coupling</th><th>Evidence</th></tr>{rows}</table></div>")
+
+    ds = sec["diff_set"]
+    files = validate._items(ds.get("files_changed"))
+    rows = "".join(f"<tr><td><code>{e(f.get('path'))}</code></td><td>{e(f.get('change_type'))}</td>"
+                   f"<td>{e(f.get('lines_added', ''))}</td><td>{e(f.get('lines_deleted', ''))}</td></tr>"
+                   for f in files[:MAX_FILES_LISTED])
+    more = (f'<div class="muted">... and {len(files) - MAX_FILES_LISTED} more files</div>'
+            if len(files) > MAX_FILES_LISTED else "")
+    notes = "".join(f"<li><code>{e(r.get('constraint_id'))}</code> {e(r.get('note'))}</li>"
+                    for r in validate._items(ds.get("rationale")))
+    parts.append(f'<div class="box"><h2>DiffSet</h2><div class="muted">{e(ds.get("base_ref"))} &rarr; {e(ds.get("final_ref"))}'
+                 f" &bull; {len(files)} files</div><table><tr><th>Path</th><th>Change</th><th>+</th><th>-</th></tr>"
+                 f"{rows}</table>{more}<h3>Rationale</h3><ul>{notes}</ul></div>")
+
+    fg = sec["final_green"]
+    metrics = fg.get("summary_metrics") if isinstance(fg.get("summary_metrics"), dict) else {}
+    shown = ", ".join(f"{k}: {v}" for k, v in metrics.items() if k != "benchmarks")
+    parts.append(f'<div class="box"><h2>FinalGreen {pill("passed" if fg.get("all_checks_passed") is True else "not passed", fg.get("all_checks_passed") is True)}</h2>'
+                 f'<div>Run: <code>{e(fg.get("run_id"))}</code></div>'
+                 f'<div>Evidence: {evidence_link(fg.get("evidence_ref"), record_path, page_dir)}</div>'
+                 f'<div class="muted">{e(shown)}</div></div>')
+
+    sd = sec["spec_delta"]
+    changes = "".join(f"<li><code>{e(c.get('id'))}</code> ({e(c.get('kind'))}): {e(c.get('before'))} &rarr; "
+                      f"{e(c.get('after'))} <span class=\"muted\">{e(c.get('reason'))}</span></li>"
+                      for c in validate._items(sd.get("changes")))
+    parts.append(f'<div class="box"><h2>SpecDelta {pill("changed" if sd.get("changed") else "unchanged", not sd.get("changed"))}</h2>'
+                 f'<div>Human decision: {e(sd.get("human_decision"))}</div><ul>{changes}</ul></div>')
+    return page(f"WorkUnit {record.get('work_id', '(missing)')}", "\n".join(parts), depth=1)
+
+_VALIDATOR = None
+
+def _init_worker(schema_path: str) -> None:
+    global _VALIDATOR
+    _VALIDATOR = validate.compile_schema(validate.load_schema(Path(schema_path)))
+
+def render_source(task: tuple) -> dict:
+    """Render every record in one source file; returns its manifest entry."""
+    source, rel, out_dir = task
+    path, out_dir = Path(source), Path(out_dir)
+    entry = {"stat": _stat(path), "inputs": {}, "rows": []}
+    try:
+        documents = list(validate.iter_records(path))
+    except OSError as exc:
+        documents = [("document 1", exc)]
+    expected = expected_outcome(path)
+    if expected is not None:
+        entry["inputs"][str(expected_file(path))] = _stat(expected_file(path))
+    for n, (location, record) in enumerate(documents, 1):
+        name = page_name(rel, n, len(documents))
+        page_dir = (out_dir / name).parent
+        if not isinstance(record, dict):
+            why = record if isinstance(record, Exception) else "document is not a mapping"
+            write_if_changed(out_dir / name, page(f"Unreadable record in {rel}",
+                                                  f'<div class="box">{e(location)}: {e(why)}</div>', depth=1))
+            entry["rows"].append({"page": name, "work_id": None, "agent": None, "types": [], "valid": False,
+                                  "errors": 1, "source": rel, "location": location, "expected": expected})
+            continue
+        result = validate.validate_record(record, path.resolve(), _VALIDATOR)
+        write_if_changed(out_dir / name, render_record(record, path, location, rel, result, page_dir, expected))
+        for p in validate.evidence_paths(record, path.resolve()):
+            entry["inputs"][str(p)] = _stat(p)
+        agent = record.get("actor", {}).get("agent") if isinstance(record.get("actor"), dict) else None
+        types = sorted({c.get("type") or "untyped"
+                        for c in validate._items((record.get("mini_spec") or {}).get("constraints"))})
+        entry["rows"].append({"page": name, "work_id": record.get("work_id"), "agent": agent, "types": types,
+                              "valid": not result["errors"], "errors": len(result["errors"]), "source": rel,
+                              "location": location, "expected": expected})
+    for row in entry["rows"]:
+        row["html"] = _row(row)  # index pages only join these, so rebuilding them stays cheap
+    return entry
+
+def is_fresh(entry, source: Path, seen: dict) -> bool:
+    """Source and input (evidence, expected.md) stats unchanged; `seen` memoizes stats shared across records."""
+    if not entry or entry.get("stat") != _stat(source):
+        return False
+    for p, st in entry["inputs"].items():
+        if p not in seen:
+            seen[p] = _stat(Path(p))
+        if seen[p] != st:
+            return False
+    return True
+
+def discover(args: list) -> list:
+    """(absolute path, report-relative name) for every record; directories are walked without resolving each file."""
+    found, seen = [], set()
+    for arg in args:
+        if os.path.isdir(arg):
+            top = os.path.realpath(arg)
+            files = []
+            for dirpath, dirnames, filenames in os.walk(top):
+                dirnames.sort()
+                files.extend(os.path.join(dirpath, f) for f in filenames
+                             if os.path.splitext(f)[1].lower() in validate.RECORD_SUFFIXES)
+            files.sort()
+        else:
+            files = [os.path.realpath(p) for p in validate.expand_paths([arg])]
+        for f in files:
+            if f not in seen:
+                seen.add(f)
+                rel = os.path.relpath(f, ROOT)
+                found.append((f, Path(rel).as_posix() if not rel.startswith("..") else f))
+    return found
+
+def _row(r: dict) -> str:
+    return (f'<tr><td><a href="{e(r["page"])}"><code>{e(r["work_id"] or "(missing)")}</code></a></td>'
+            f'<td>{e(r["agent"])}</td><td>{e(", ".join(r["types"]))}</td>'
+            f'<td>{pill("VALID" if r["valid"] else "INVALID", r["valid"])}</td>'
+            f'<td class="muted">{e(r["source"])}</td></tr>')
+
+def _table(rows: list) -> str:
+    return ("<table><tr><th>WorkUnit</th><th>Agent</th><th>Constraint types</th><th>Result</th><th>Source</th></tr>"
+            + "".join(r["html"] for r in rows) + "</table>")
+
+def _grouped(groups: dict) -> str:
+    toc = " ".join(f'<a href="#g{i}">{e(k)}</a> ({len(v)})' for i, (k, v) in enumerate(groups.items()))
+    return f"<p>{toc}</p>" + "".join(f'<h2 id="g{i}">{e(k)}</h2>{_table(v)}' for i, (k, v) in enumerate(groups.items()))
+
+def index_pages(rows: list) -> dict:
+    rows = sorted(rows, key=lambda r: (str(r["work_id"]), r["source"], r["page"]))
+    valid = sum(r["valid"] for r in rows)
+    summary = f'<p class="muted">{len(rows)} records: {valid} valid, {len(rows) - valid} invalid.</p>'
+    by_agent, by_type = {}, {}
+    for r in rows:
+        by_agent.setdefault(r["agent"] or "(none)", []).append(r)
+        for t in r["types"] or ["(no constraints)"]:
+            by_type.setdefault(t, []).append(r)
+    by_validity = {"INVALID": [r for r in rows if not r["valid"]], "VALID": [r for r in rows if r["valid"]]}
+    packs = [r for r in rows if r["expected"]]
+    pack_rows = "".join(
+        f'<tr><td><a href="{e(r["page"])}">{e(Path(r["source"]).parent.name)}</a></td><td>{e(r["expected"])}</td>'
+        f'<td>{"VALID" if r["valid"] else "INVALID"}</td>'
+        f'<td>{pill("PASS" if r["expected"] == ("VALID" if r["valid"] else "INVALID") else "FAIL", r["expected"] == ("VALID" if r["valid"] else "INVALID"))}</td></tr>'
+        for r in sorted(packs, key=lambda r: r["source"]))
+    return {
+        "index.html": page("AHS audit report", summary + _table(rows)),
+        "agents.html": page("Records by agent", _grouped(dict(sorted(by_agent.items())))),
+        "types.html": page("Records by constraint type", _grouped(dict(sorted(by_type.items())))),
+        "validity.html": page("Records by validity", summary + _grouped(by_validity)),
+        "packs.html": page("Challenge packs", "<table><tr><th>Pack</th><th>Expected</th><th>Actual</th><th>Status</th></tr>"
+                           + pack_rows + "</table>"),
+    }
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Render a static HTML report over audit records.")
+    ap.add_argument("paths", nargs="*", help="record files, directories or globs (default: examples/ and challenge packs)")
+    ap.add_argument("--out", type=Path, default=DEFAULT_OUT, help=f"output directory (default: {DEFAULT_OUT})")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="render in N processes")
+    ap.add_argument("--force", action="store_true", help="re-render every page")
+    args = ap.parse_args()
+
+    started = time.perf_counter()
+    out_dir = args.out.resolve()
+    manifest_path = out_dir / MANIFEST
+    version = generator_version()
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        manifest = {}
+    reuse = manifest.get("version") == version and not args.force
+    sources = manifest.get("sources", {}) if reuse else {}
+    # Pages from a discarded manifest; whichever are not rendered again are deleted below.
+    orphans = set() if reuse else {r["page"] for entry in manifest.get("sources", {}).values()
+                                   for r in entry.get("rows", [])}
+
+    current, stale, seen = {}, [], {}
+    for path, rel in discover(args.paths or DEFAULT_INPUTS):
+        current[rel] = path
+        if not is_fresh(sources.get(rel), Path(path), seen):
+            stale.append((path, rel, str(out_dir)))
+
+    schema_path = str(validate.default_schema_path())
+    if args.jobs > 1 and len(stale) > 1:
+        with multiprocessing.Pool(args.jobs, initializer=_init_worker, initargs=(schema_path,)) as pool:
+            rendered = pool.map(render_source, stale, chunksize=max(1, len(stale) // (args.jobs * 8)))
+    else:
+        _init_worker(schema_path)
+        rendered = [render_source(t) for t in stale]
+    for (_, rel, _), entry in zip(stale, rendered):
+        old = {r["page"] for r in sources.get(rel, {}).get("rows", [])}
+        for gone in old - {r["page"] for r in entry["rows"]}:
+            (out_dir / gone).unlink(missing_ok=True)
+        sources[rel] = entry
+
+    removed = [rel for rel in sources if rel not in current]
+    for rel in removed:
+        for r in sources.pop(rel)["rows"]:
+            (out_dir / r["page"]).unlink(missing_ok=True)
+    for name in orphans - {r["page"] for entry in sources.values() for r in entry["rows"]}:
+        (out_dir / name).unlink(missing_ok=True)
+
+    rows = [r for entry in sources.values() for r in entry["rows"]]
+    updated = sum(write_if_changed(out_dir / name, text) for name, text in index_pages(rows).items())
+    write_if_changed(manifest_path, json.dumps({"version": version, "sources": sources}, sort_keys=True))
+    print(f"Rendered {len(stale)} of {len(current)} sources ({sum(len(x['rows']) for x in rendered)} pages), "
+          f"removed {len(removed)}, {updated} index pages updated in {time.perf_counter() - started:.2f} s")
+    print(f"Report: {out_dir / 'index.html'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
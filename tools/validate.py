@@ -10,178 +10,912 @@ Validates:
 Usage:
   python3 tools/validate.py examples/golden-record.yaml
   python3 tools/validate.py --strict path/to/record.yaml
+  python3 tools/validate.py --jobs 8 examples/ 'challenge-packs/*/workunit.yaml'
+
+Several paths, directories (searched recursively for .yaml/.yml/.json) and
+glob patterns may be given. The schema is compiled once and records are
+spread across a process pool; the exit code is 0 only if every record is VALID.
+
+Append-only audit logs (.jsonl/.ndjson, or multi-document YAML with
+--stream) are read one record at a time so memory stays bounded; errors
+are reported per line or per document:
+
+  python3 tools/validate.py --quiet agent-log.jsonl
+  python3 tools/validate.py --stream agent-log.yaml
+
+Startup is kept short for agents that call the validator in tight loops:
+PyYAML is only imported for YAML inputs (using libyaml's CSafeLoader when
+available), and jsonschema only once a record actually misses the cache.
+tools/bench-startup.py measures the cold start.
+
+For validation inside agent loops, run a warm daemon once and point the
+CLI at it (same output and exit codes; falls back to local validation if
+the daemon is not reachable):
+
+  python3 tools/validate.py --serve --address unix:/tmp/ahs.sock
+  python3 tools/validate.py --connect --address unix:/tmp/ahs.sock record.yaml
+
+--timings adds wall/CPU time per phase (load, schema, invariants, evidence
+I/O) and per invariant rule. --format json prints one JSON document with
+structured findings ({"rule", "path", "message"}), per-record timings, the
+aggregated timing block and a summary, for callers that should not scrape
+the VALID/INVALID text.
+
+Results are cached under .ahs-cache/ keyed on the record bytes, the schema,
+the validator version and the referenced evidence files (see
+tools/validation_cache.py); pass --no-cache to revalidate from scratch.
 """
 from __future__ import annotations
 
 import json
+import os
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 
+__version__ = "0.1.0"
+
+STREAM_SUFFIXES = (".jsonl", ".ndjson")
+RECORD_SUFFIXES = (".yaml", ".yml", ".json") + STREAM_SUFFIXES
+
+def yaml_loader():
+    """Return (yaml module, fastest safe Loader class): libyaml's CSafeLoader when compiled in."""
+    try:
+        import yaml
+    except ImportError:
+        raise SystemExit("PyYAML not installed. Install with: pip install pyyaml")
+    return yaml, getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def parse_record(txt: str, suffix: str) -> dict:
+    if suffix.lower() in (".yaml", ".yml"):
+        yaml, loader = yaml_loader()
+        return yaml.load(txt, Loader=loader)
+    return json.loads(txt)
+
 def load_record(p: Path) -> dict:
-    txt = p.read_text(encoding="utf-8")
-    if p.suffix.lower() in (".yaml", ".yml"):
+    return parse_record(p.read_text(encoding="utf-8"), p.suffix)
+
+def iter_records(p: Path):
+    """
+    Yield (location, record) one document at a time from a JSON Lines file,
+    a multi-document YAML stream or a plain JSON file. A document that
+    cannot be parsed is yielded as the exception instead of a record; a YAML
+    syntax or decoding error ends the stream because the parser cannot
+    resynchronise.
+    """
+    suffix = p.suffix.lower()
+    if suffix in STREAM_SUFFIXES:
+        # Lines are decoded by json.loads, so a line that is not UTF-8 is one bad
+        # document (UnicodeDecodeError is a ValueError) rather than the end of the stream.
+        with open(p, "rb") as f:
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield f"line {lineno}", json.loads(line)
+                except ValueError as e:
+                    yield f"line {lineno}", e
+        return
+    if suffix == ".json":
+        with open(p, encoding="utf-8") as f:
+            try:
+                yield "document 1", json.load(f)
+            except ValueError as e:
+                yield "document 1", e
+        return
+
+    yaml, loader_class = yaml_loader()
+    with open(p, encoding="utf-8") as f:
+        loader = loader_class(f)
+        index = 0
         try:
-            import yaml
-        except ImportError:
-            raise SystemExit("PyYAML not installed. Install with: pip install pyyaml")
-        return yaml.safe_load(txt)
-    return json.loads(txt)
+            while True:
+                try:
+                    if not loader.check_node():
+                        break
+                    # Compose then construct (rather than get_data) to learn where the document starts.
+                    node = loader.get_node()
+                    line = node.start_mark.line + 1 if node is not None else "?"
+                    index += 1
+                    record = loader.construct_document(node) if node is not None else None
+                except (yaml.YAMLError, ValueError) as e:  # ValueError: bytes that are not UTF-8
+                    yield f"document {index + 1}", e
+                    break
+                yield f"document {index} (line {line})", record
+        finally:
+            loader.dispose()
 
 def load_schema(schema_path: Path) -> dict:
     return json.loads(schema_path.read_text(encoding="utf-8"))
 
-def schema_validate(schema: dict, record: dict) -> list[str]:
+def compile_schema(schema: dict):
     try:
         import jsonschema
     except ImportError:
         raise SystemExit("jsonschema not installed. Install with: pip install jsonschema")
-    v = jsonschema.Draft202012Validator(schema)
-    errs = []
+    return jsonschema.Draft202012Validator(schema)
+
+class LazySchemaValidator:
+    """Stands in for a compiled validator; imports jsonschema and compiles on first use."""
+
+    def __init__(self, schema_path: Path):
+        self.schema_path = schema_path
+        self._validator = None
+
+    def iter_errors(self, record):
+        if self._validator is None:
+            self._validator = compile_schema(load_schema(self.schema_path))
+        return self._validator.iter_errors(record)
+
+def schema_findings(schema, record: dict) -> list[tuple[str, str, str]]:
+    """(rule_id, path, message) for each schema error; schema is a dict or a compiled validator."""
+    v = schema if hasattr(schema, "iter_errors") else compile_schema(schema)
+    found = []
     for e in sorted(v.iter_errors(record), key=lambda e: e.path):
         loc = ".".join([str(x) for x in e.path]) or "<root>"
-        errs.append(f"{loc}: {e.message}")
-    return errs
-
-def invariants(record: dict, record_path: Path | None = None) -> list[str]:
-    errs = []
-    constraints = record.get("mini_spec", {}).get("constraints", [])
-    if not constraints:
-        errs.append("mini_spec.constraints must have at least 1 item")
-
-    if record.get("first_red", {}).get("occurred") is not True:
-        errs.append("first_red.occurred must be true (no red without green)")
-
-    failing = record.get("first_red", {}).get("failing_checks", [])
-    if record.get("first_red", {}).get("occurred") is True and len(failing) < 1:
-        errs.append("first_red.failing_checks must have at least 1 item when occurred is true")
-
-    if record.get("final_green", {}).get("all_checks_passed") is not True:
-        errs.append("final_green.all_checks_passed must be true")
-
-    spec_delta = record.get("spec_delta", {})
-    if spec_delta.get("changed") is True:
-        if spec_delta.get("human_decision") not in ("accepted","rejected"):
-            errs.append("spec_delta.human_decision must be accepted/rejected when spec_delta.changed is true")
-        if not spec_delta.get("changes"):
-            errs.append("spec_delta.changes must be non-empty when spec_delta.changed is true")
-
-    # Direct red rule: functional, negative, or performance constraints must have at least one direct red
-    critical_types = {"functional", "negative", "performance"}
-    critical_constraints = [c for c in constraints if c.get("type") in critical_types]
-    
-    # Build set of constraint IDs that have direct reds
-    direct_red_constraint_ids = set()
-    for fc in failing:
-        if fc.get("coupling") == "direct":
-            direct_red_constraint_ids.update(fc.get("constraint_ids", []))
-    
-    # Check which critical constraints lack direct reds
-    missing_direct_red = [c.get("id") for c in critical_constraints 
-                          if c.get("id") not in direct_red_constraint_ids]
-    
-    if missing_direct_red:
-        errs.append(f"Constraints {missing_direct_red} lack a direct red (required for functional, negative, or performance types)")
-
-    # Constraint coverage: critical constraints must have at least one failing check
-    critical_types = {"functional", "negative", "performance"}
-    critical_constraints = [c for c in constraints if c.get("type") in critical_types]
-    constraint_ids_with_failing_check = set()
-    for fc in failing:
-        constraint_ids_with_failing_check.update(fc.get("constraint_ids", []))
-    
-    uncovered_constraints = [c.get("id") for c in critical_constraints if c.get("id") not in constraint_ids_with_failing_check]
-    if uncovered_constraints:
-        errs.append(f"Constraints {uncovered_constraints} have no failing check mapped to them")
-
-    # Evidence refs must exist on disk if they look like local paths
-    def check_evidence(ref: str, label: str):
-        if not ref or "://" in ref:
-            return
-        if record_path is None:
-            return
-        p = (record_path.parent / ref).resolve()
-        if not p.exists():
-            errs.append(f"{label}: evidence_ref '{ref}' does not exist on disk")
-    for fc in record.get("first_red", {}).get("failing_checks", []):
-        check_evidence(fc.get("evidence_ref",""), f"first_red.{fc.get('check_id','?')}")
-    check_evidence(record.get("final_green", {}).get("evidence_ref",""), "final_green")
-
-    # Timestamp ordering: record timestamp should not be after run_id timestamp
-    record_timestamp = record.get("timestamp_utc")
-    run_id = record.get("final_green", {}).get("run_id", "")
-    if record_timestamp and run_id:
-        # Extract timestamp from run_id (format: run-YYYY-MM-DDThh:mm:ssZ)
-        run_timestamp_str = run_id.replace("run-", "")
+        found.append(("schema", loc, f"{loc}: {e.message}"))
+    return found
+
+def schema_validate(schema, record: dict) -> list[str]:
+    """Validate against a schema dict or a validator from compile_schema()."""
+    return [message for _, _, message in schema_findings(schema, record)]
+
+CRITICAL_TYPES = {"functional", "negative", "performance"}
+
+# evidence_ref prefix for objects in the content-addressed store (tools/evidence_store.py)
+STORE_REF_PREFIX = "sha256:"
+
+# mini_spec constraint threshold -> (final_green benchmark metric, bound kind)
+THRESHOLDS = {
+    "min_throughput_per_sec": ("throughput_per_sec", "min"),
+    "max_p50_ms": ("p50_ms", "max"),
+    "max_p99_ms": ("p99_ms", "max"),
+    "max_peak_memory_bytes": ("peak_memory_bytes", "max"),
+    "min_samples": ("samples", "min"),
+}
+
+def sha256_mmap(p: Path) -> str:
+    """SHA-256 of a file hashed straight from a read-only memory map (no copies through Python)."""
+    import hashlib
+    import mmap
+
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+    return h.hexdigest()
+
+class EvidenceCache:
+    """
+    Per-run stat and hash results for evidence files, shared by every record
+    in the process, so a log referenced by many records is stat'ed and read
+    once. Hashes are keyed on (path, size, mtime, inode) and survive
+    reset_stats(), which a long-lived process calls between runs. Threads
+    that serve concurrent runs use run_scope() instead, which gives the
+    calling thread its own stat results and leaves the shared ones alone.
+    """
+
+    def __init__(self):
+        self._stats: dict[Path, os.stat_result | None] = {}
+        self._hashes: dict[tuple, str] = {}
+        self._local = threading.local()
+
+    def reset_stats(self) -> None:
+        self._stats = {}
+
+    @contextmanager
+    def run_scope(self):
+        """Fresh stat results for the calling thread until the block exits; hashes stay shared."""
+        self._local.stats = {}
         try:
-            record_dt = datetime.fromisoformat(record_timestamp.replace("Z", "+00:00"))
-            run_dt = datetime.fromisoformat(run_timestamp_str.replace("Z", "+00:00"))
-            if record_dt > run_dt:
-                errs.append(f"timestamp_utc ({record_timestamp}) is after final_green.run_id timestamp ({run_timestamp_str})")
-        except ValueError:
-            pass  # Skip validation if timestamps can't be parsed
+            yield self
+        finally:
+            del self._local.stats
+
+    def stat(self, p: Path) -> os.stat_result | None:
+        stats = getattr(self._local, "stats", None)
+        if stats is None:
+            stats = self._stats
+        try:
+            return stats[p]
+        except KeyError:
+            pass
+        try:
+            st = p.stat()
+        except OSError:
+            st = None
+        stats[p] = st
+        return st
+
+    def exists(self, p: Path) -> bool:
+        return self.stat(p) is not None
+
+    def sha256(self, p: Path) -> str | None:
+        st = self.stat(p)
+        if st is None:
+            return None
+        key = (p, st.st_size, st.st_mtime_ns, st.st_ino)
+        if key not in self._hashes:
+            self._hashes[key] = sha256_mmap(p)
+        return self._hashes[key]
+
+EVIDENCE = EvidenceCache()
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_key(value) -> bool:
+    """Usable as a dict key; ids that fail the schema (lists, mappings) are left to its errors."""
+    return not isinstance(value, (list, dict))
+
+def _items(value) -> list:
+    """List of dict items, tolerating malformed records (schema errors are reported separately)."""
+    return [x for x in value if isinstance(x, dict)] if isinstance(value, list) else []
+
+class RecordIndex:
+    """
+    Everything the invariant rules ask about a record, built in one pass:
+    constraint id -> checks, coupling -> checks, evidence ref -> labels.
+    Evidence existence and hashes are resolved lazily through the shared
+    EvidenceCache.
+    """
+
+    def __init__(self, record: dict, record_path: Path | None = None):
+        self.record = record
+        self.record_path = record_path
+        self.mini_spec = record.get("mini_spec") or {}
+        self.first_red = record.get("first_red") or {}
+        self.final_green = record.get("final_green") or {}
+        self.spec_delta = record.get("spec_delta") or {}
+
+        self.constraints = _items(self.mini_spec.get("constraints", []))
+        self.critical_ids = [c.get("id") for c in self.constraints if c.get("type") in CRITICAL_TYPES]
+        self.thresholds = {c.get("id"): c["thresholds"] for c in self.constraints
+                           if isinstance(c.get("thresholds"), dict) and _is_key(c.get("id"))}
+        metrics = self.final_green.get("summary_metrics")
+        self.benchmarks: dict[str, list[dict]] = {}  # every entry per constraint: a duplicate cannot mask a miss
+        for b in _items(metrics.get("benchmarks", []) if isinstance(metrics, dict) else []):
+            if _is_key(b.get("constraint_id")):
+                self.benchmarks.setdefault(b.get("constraint_id"), []).append(b)
+        self.failing = _items(self.first_red.get("failing_checks", []))
+
+        self.checks_by_constraint: dict[str, list[str]] = {}
+        self.checks_by_coupling: dict[str, list[str]] = {}
+        self.direct_constraint_ids: set[str] = set()
+        self.evidence_labels: dict[str, list[str]] = {}
+        self.evidence_order: list[tuple[str, str]] = []  # (label, ref) in record order
+        self.evidence_sha256: list[tuple[str, str, str]] = []  # (label, ref, declared hash)
+        for fc in self.failing:
+            check_id = fc.get("check_id", "?")
+            cids = fc.get("constraint_ids") or []
+            for cid in cids:
+                self.checks_by_constraint.setdefault(cid, []).append(check_id)
+            self.checks_by_coupling.setdefault(fc.get("coupling"), []).append(check_id)
+            if fc.get("coupling") == "direct":
+                self.direct_constraint_ids.update(cids)
+            self._add_evidence(fc, f"first_red.{check_id}")
+        self._add_evidence(self.final_green, "final_green")
+        self._resolved: dict[str, Path | None] = {}
+        self._store = False  # not looked up yet
+
+    def _add_evidence(self, holder: dict, label: str) -> None:
+        ref = holder.get("evidence_ref", "")
+        if not isinstance(ref, str):
+            return
+        self.evidence_labels.setdefault(ref, []).append(label)
+        self.evidence_order.append((label, ref))
+        if holder.get("evidence_sha256"):
+            self.evidence_sha256.append((label, ref, holder["evidence_sha256"]))
+
+    def local_evidence(self, ref: str) -> Path | None:
+        """Resolved path for a local evidence ref, or None for empty/remote refs or an unknown record location."""
+        if ref not in self._resolved:
+            if self.record_path is None or not ref or "://" in ref or ref.startswith(STORE_REF_PREFIX):
+                self._resolved[ref] = None
+            else:
+                self._resolved[ref] = (self.record_path.parent / ref).resolve()
+        return self._resolved[ref]
+
+    def evidence_store(self):
+        """The evidence store serving this record's `sha256:` refs, or None (looked up once)."""
+        if self._store is False:
+            self._store = None
+            if self.record_path is not None:
+                import evidence_store
+
+                self._store = evidence_store.find_store(self.record_path.parent)
+                if self._store is not None:
+                    self._store.refresh()  # one stat; re-reads only appended index lines
+        return self._store
+
+    def missing_evidence(self) -> list[tuple[str, str]]:
+        """(label, ref) for every local or store evidence ref that does not exist, in record order."""
+        missing = []
+        for label, ref in self.evidence_order:
+            if ref.startswith(STORE_REF_PREFIX) and self.record_path is not None:
+                store = self.evidence_store()  # an index lookup, not a stat per ref
+                if store is None or not store.contains(ref[len(STORE_REF_PREFIX):].lower()):
+                    missing.append((label, ref))
+                continue
+            p = self.local_evidence(ref)
+            if p is not None and not EVIDENCE.exists(p):
+                missing.append((label, ref))
+        return missing
+
+    def mismatched_evidence(self) -> list[tuple[str, str]]:
+        """(label, ref) for existing local evidence whose content differs from its evidence_sha256."""
+        mismatched = []
+        for label, ref, declared in self.evidence_sha256:
+            if ref.startswith(STORE_REF_PREFIX):
+                # Store refs are named by their content hash, so no read is needed.
+                if str(declared).lower() != ref[len(STORE_REF_PREFIX):].lower():
+                    mismatched.append((label, ref))
+                continue
+            p = self.local_evidence(ref)
+            if p is None:
+                continue
+            actual = EVIDENCE.sha256(p)
+            if actual is not None and actual != declared:
+                mismatched.append((label, ref))
+        return mismatched
+
+# Invariant rules, run cheapest first. Each takes a RecordIndex and returns
+# (path, message) findings; register new ones with @rule instead of
+# re-walking the record. `phase` groups rule time in --timings output.
+RULES: list[tuple[int, str, object, str]] = []
+
+def rule(rule_id: str, cost: int = 1, phase: str = "invariants"):
+    def register(fn):
+        RULES.append((cost, rule_id, fn, phase))
+        RULES.sort(key=lambda r: r[0])  # stable: equal cost keeps registration order
+        return fn
+    return register
+
+def _clock() -> tuple[float, float]:
+    return time.perf_counter(), time.thread_time()
+
+def _add_time(bucket: dict, name: str, start: tuple[float, float]) -> None:
+    """Add the wall/CPU time since start (from _clock) to bucket[name]."""
+    wall, cpu = _clock()
+    t = bucket.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0})
+    t["wall_ms"] += (wall - start[0]) * 1000
+    t["cpu_ms"] += (cpu - start[1]) * 1000
+
+@rule("constraints-present", cost=0)
+def _constraints_present(ix: RecordIndex):
+    if not ix.constraints:
+        return [("mini_spec.constraints", "mini_spec.constraints must have at least 1 item")]
+    return []
+
+@rule("first-red-occurred", cost=0)
+def _first_red_occurred(ix: RecordIndex):
+    if ix.first_red.get("occurred") is not True:
+        return [("first_red.occurred", "first_red.occurred must be true (no red without green)")]
+    return []
 
-    return errs
+@rule("first-red-has-checks", cost=0)
+def _first_red_has_checks(ix: RecordIndex):
+    if ix.first_red.get("occurred") is True and len(ix.failing) < 1:
+        return [("first_red.failing_checks",
+                 "first_red.failing_checks must have at least 1 item when occurred is true")]
+    return []
 
-def strict_checks(record: dict, record_path: Path) -> list[str]:
+@rule("final-green-passed", cost=0)
+def _final_green_passed(ix: RecordIndex):
+    if ix.final_green.get("all_checks_passed") is not True:
+        return [("final_green.all_checks_passed", "final_green.all_checks_passed must be true")]
+    return []
+
+@rule("spec-delta-decided", cost=0)
+def _spec_delta_decided(ix: RecordIndex):
+    found = []
+    if ix.spec_delta.get("changed") is True:
+        if ix.spec_delta.get("human_decision") not in ("accepted", "rejected"):
+            found.append(("spec_delta.human_decision",
+                          "spec_delta.human_decision must be accepted/rejected when spec_delta.changed is true"))
+        if not ix.spec_delta.get("changes"):
+            found.append(("spec_delta.changes",
+                          "spec_delta.changes must be non-empty when spec_delta.changed is true"))
+    return found
+
+@rule("direct-red", cost=1)
+def _direct_red(ix: RecordIndex):
+    # Checkpoint B: functional, negative, or performance constraints must have at least one direct red
+    missing = [cid for cid in ix.critical_ids if cid not in ix.direct_constraint_ids]
+    if missing:
+        return [("first_red.failing_checks",
+                 f"Constraints {missing} lack a direct red (required for functional, negative, or performance types)")]
+    return []
+
+@rule("constraint-coverage", cost=1)
+def _constraint_coverage(ix: RecordIndex):
+    uncovered = [cid for cid in ix.critical_ids if cid not in ix.checks_by_constraint]
+    if uncovered:
+        return [("first_red.failing_checks", f"Constraints {uncovered} have no failing check mapped to them")]
+    return []
+
+@rule("performance-thresholds", cost=1)
+def _performance_thresholds(ix: RecordIndex):
+    # Declared thresholds must be met by the final green's recorded benchmark for that constraint
+    found = []
+    for cid, thresholds in ix.thresholds.items():
+        benches = ix.benchmarks.get(cid)
+        if not benches:
+            found.append(("final_green.summary_metrics.benchmarks",
+                          f"Constraint {cid} declares thresholds but final_green has no benchmark for it"))
+            continue
+        for bench in benches:
+            for name, bound in thresholds.items():
+                if name not in THRESHOLDS or not _is_number(bound):
+                    continue  # a non-numeric bound is a schema error, not a comparison
+                metric, kind = THRESHOLDS[name]
+                value = bench.get(metric)
+                path = f"final_green.summary_metrics.benchmarks.{cid}.{metric}"
+                if not _is_number(value):
+                    found.append((path, f"Constraint {cid} declares {name} but its benchmark has no {metric}"))
+                elif kind == "min" and value < bound:
+                    found.append((path, f"Constraint {cid}: {metric} {value} is below {name} {bound}"))
+                elif kind == "max" and value > bound:
+                    found.append((path, f"Constraint {cid}: {metric} {value} exceeds {name} {bound}"))
+    known = {c.get("id") for c in ix.constraints if _is_key(c.get("id"))}
+    unknown = [cid for cid in ix.benchmarks if cid not in known]
+    if unknown:
+        found.append(("final_green.summary_metrics.benchmarks",
+                      f"Benchmarks reference unknown constraints {unknown}"))
+    return found
+
+@rule("timestamp-order", cost=2)
+def _timestamp_order(ix: RecordIndex):
+    # Record timestamp should not be after the run_id timestamp (format: run-YYYY-MM-DDThh:mm:ssZ)
+    record_timestamp = ix.record.get("timestamp_utc")
+    run_id = ix.final_green.get("run_id", "")
+    if not (record_timestamp and run_id and isinstance(record_timestamp, str) and isinstance(run_id, str)):
+        return []
+    run_timestamp_str = run_id.replace("run-", "")
+    try:
+        record_dt = datetime.fromisoformat(record_timestamp.replace("Z", "+00:00"))
+        run_dt = datetime.fromisoformat(run_timestamp_str.replace("Z", "+00:00"))
+        if record_dt > run_dt:
+            return [("timestamp_utc",
+                     f"timestamp_utc ({record_timestamp}) is after final_green.run_id timestamp ({run_timestamp_str})")]
+    except (ValueError, TypeError):
+        pass  # Skip validation if timestamps can't be parsed or compared
+    return []
+
+@rule("evidence-exists", cost=3, phase="evidence")
+def _evidence_exists(ix: RecordIndex):
+    # Evidence refs must exist on disk if they look like local paths (filesystem I/O: run last)
+    return [(f"{label}.evidence_ref",
+             f"{label}: evidence_ref '{ref}' is not in the evidence store" if ref.startswith(STORE_REF_PREFIX)
+             else f"{label}: evidence_ref '{ref}' does not exist on disk")
+            for label, ref in ix.missing_evidence()]
+
+@rule("evidence-sha256", cost=4, phase="evidence")
+def _evidence_sha256(ix: RecordIndex):
+    # Declared evidence hashes must match the file content (reads each file once per run)
+    return [(f"{label}.evidence_sha256", f"{label}: evidence_ref '{ref}' does not match evidence_sha256")
+            for label, ref in ix.mismatched_evidence()]
+
+def run_rules(ix: RecordIndex, fail_fast: bool = False, timings: dict | None = None) -> list[tuple[str, str, str]]:
+    """
+    Run registered rules cheapest first; returns (rule_id, path, message)
+    findings. If timings is given, per-rule and per-phase wall/CPU time is
+    added to timings["rules"] and timings["phases"].
+    """
+    findings = []
+    for _, rule_id, fn, phase in RULES:
+        start = _clock() if timings is not None else None
+        for path, message in fn(ix):
+            findings.append((rule_id, path, message))
+        if timings is not None:
+            _add_time(timings.setdefault("rules", {}), rule_id, start)
+            _add_time(timings.setdefault("phases", {}), phase, start)
+        if fail_fast and findings:
+            break
+    return findings
+
+def invariants(record: dict, record_path: Path | None = None, fail_fast: bool = False,
+               index: RecordIndex | None = None) -> list[str]:
+    ix = index or RecordIndex(record, record_path)
+    return [message for _, _, message in run_rules(ix, fail_fast)]
+
+def strict_checks(record: dict, record_path: Path, index: RecordIndex | None = None) -> list[str]:
+    ix = index or RecordIndex(record, record_path)
     warns = []
     # Encourage mapping failing checks to constraints
-    for fc in record.get("first_red", {}).get("failing_checks", []):
+    for fc in ix.failing:
         if not fc.get("constraint_ids"):
             warns.append(f"first_red failing_check '{fc.get('check_id','?')}' has empty constraint_ids (harder to audit)")
-    # Evidence refs should exist as files relative to record path, if they look like local paths
-    def check_evidence(ref: str, label: str):
-        if not ref or "://" in ref:
-            return
-        p = (record_path.parent / ref).resolve()
-        if not p.exists():
-            warns.append(f"{label}: evidence_ref '{ref}' does not exist on disk (ok if stored elsewhere)")
-    for fc in record.get("first_red", {}).get("failing_checks", []):
-        check_evidence(fc.get("evidence_ref",""), f"first_red.{fc.get('check_id','?')}")
-    check_evidence(record.get("final_green", {}).get("evidence_ref",""), "final_green")
+    # Evidence refs should exist as files relative to record path (shares the index's existence checks)
+    for label, ref in ix.missing_evidence():
+        warns.append(f"{label}: evidence_ref '{ref}' does not exist on disk (ok if stored elsewhere)")
     return warns
 
-def main() -> int:
-    strict = False
-    args = [a for a in sys.argv[1:] if a.strip()]
-    if not args or len(args) > 2:
-        print("Usage: python3 tools/validate.py [--strict] path/to/record.(yaml|json)")
-        return 2
-    if args[0] == "--strict":
-        strict = True
-        if len(args) != 2:
-            print("Usage: python3 tools/validate.py --strict path/to/record.(yaml|json)")
-            return 2
-        record_path = Path(args[1]).resolve()
-    else:
-        record_path = Path(args[0]).resolve()
+def default_schema_path() -> Path:
+    return Path(__file__).resolve().parents[1] / "schemas" / "ahs-audit.schema.json"
 
-    root = Path(__file__).resolve().parents[1]
-    schema_path = root / "schemas" / "ahs-audit.schema.json"
+_VALIDATOR_VERSION = None
 
-    record = load_record(record_path)
-    schema = load_schema(schema_path)
+def validator_version() -> str:
+    """Release version plus a hash of this file and of the modules cached results depend on."""
+    global _VALIDATOR_VERSION
+    if _VALIDATOR_VERSION is None:
+        import hashlib
+        here = Path(__file__).resolve().parent
+        h = hashlib.sha256()
+        for name in ("validate.py", "evidence_store.py", "validation_cache.py"):
+            h.update((here / name).read_bytes())
+        digest = h.hexdigest()[:12]
+        _VALIDATOR_VERSION = f"{__version__}+{digest}"
+    return _VALIDATOR_VERSION
 
-    errors = []
-    errors += schema_validate(schema, record)
-    errors += invariants(record, record_path)
+def evidence_paths(record: dict, record_path: Path) -> list[Path]:
+    """Local evidence files referenced by a record, resolved relative to it."""
+    refs = [fc.get("evidence_ref", "") for fc in record.get("first_red", {}).get("failing_checks", [])
+            if isinstance(fc, dict)]
+    refs.append(record.get("final_green", {}).get("evidence_ref", ""))
+    out = []
+    for ref in dict.fromkeys(refs):
+        if not isinstance(ref, str) or not ref or "://" in ref:
+            continue
+        if ref.startswith(STORE_REF_PREFIX):
+            # Store objects are immutable; only the index decides whether a ref resolves. The
+            # candidates are fingerprinted even when missing, so creating a store busts the entry.
+            import evidence_store
 
+            out.extend(p for p in evidence_store.index_candidates(record_path.parent) if p not in out)
+            continue
+        out.append((record_path.parent / ref).resolve())
+    return out
+
+def open_cache(schema_path: Path, cache_dir: Path | None, max_bytes: int | None = None):
+    """Return a ValidationCache, or None when caching is disabled."""
+    if cache_dir is None:
+        return None
+    from validation_cache import DEFAULT_MAX_BYTES, ValidationCache
+
+    return ValidationCache(cache_dir, schema_path, validator_version(),
+                           DEFAULT_MAX_BYTES if max_bytes is None else max_bytes,
+                           hasher=EVIDENCE.sha256)
+
+def expand_paths(args: list[str]) -> list[Path]:
+    """Expand files, directories and glob patterns into record paths (deduplicated, in order)."""
+    import glob
+
+    out: list[Path] = []
+    seen = set()
+    for arg in args:
+        if glob.has_magic(arg):
+            candidates = [Path(m) for m in sorted(glob.glob(arg, recursive=True))]
+        else:
+            candidates = [Path(arg)]
+        for c in candidates:
+            if c.is_dir():
+                found = sorted(f for f in c.rglob("*") if f.is_file() and f.suffix.lower() in RECORD_SUFFIXES)
+            else:
+                found = [c]
+            for f in found:
+                key = f.resolve()
+                if key not in seen:
+                    seen.add(key)
+                    out.append(f)
+    return out
+
+def _finding(rule_id: str, path: str, message: str) -> dict:
+    return {"rule": rule_id, "path": path, "message": message}
+
+def validate_record(record, record_path: Path, validator, strict: bool = False,
+                    fail_fast: bool = False, timings: dict | None = None) -> dict:
+    """
+    Schema + invariants (+ strict warnings) for an already-parsed record.
+    Returns {"errors", "warnings", "findings", "timings"}: errors are the
+    printable messages, findings the same errors as {"rule", "path", "message"}.
+    """
+    timings = timings if timings is not None else {}
+    phases = timings.setdefault("phases", {})
+    if not isinstance(record, dict):
+        return {"errors": ["<root>: record must be a mapping"], "warnings": [],
+                "findings": [_finding("load", "<root>", "<root>: record must be a mapping")], "timings": timings}
+
+    start = _clock()
+    found = schema_findings(validator, record)
+    _add_time(phases, "schema", start)
     warnings = []
-    if strict and not errors:
-        warnings = strict_checks(record, record_path)
+    try:
+        if not (fail_fast and found):
+            start = _clock()
+            index = RecordIndex(record, record_path)
+            _add_time(phases, "index", start)
+            found += run_rules(index, fail_fast, timings)
+
+        if strict and not found:
+            start = _clock()
+            warnings = strict_checks(record, record_path, index)
+            _add_time(phases, "strict", start)
+    except Exception as e:  # a crashing rule fails this record, not the whole batch
+        found.append(("internal", "<internal>", f"<internal>: rule raised {type(e).__name__}: {e}"))
+        warnings = []
+    return {"errors": [m for _, _, m in found], "warnings": warnings,
+            "findings": [_finding(*f) for f in found], "timings": timings}
+
+def validate_path(record_path: Path, validator, strict: bool = False, cache=None,
+                  fail_fast: bool = False) -> dict:
+    """
+    Validate one record file; returns {"path", "errors", "warnings",
+    "findings", "timings", "seconds", "cached"}.
+    """
+    started = time.perf_counter()
+    resolved = record_path.resolve()
+    timings = {"phases": {}}
+
+    def result(outcome: dict, cached: bool = False) -> dict:
+        return {"path": str(record_path), **outcome, "timings": timings,
+                "seconds": time.perf_counter() - started, "cached": cached}
+
+    def load_error(e: Exception) -> dict:
+        return result({"errors": [f"<load>: {e}"], "warnings": [],
+                       "findings": [_finding("load", "<load>", f"<load>: {e}")]})
+
+    start = _clock()
+    try:
+        data = resolved.read_bytes()
+    except OSError as e:
+        return load_error(e)
+
+    key = None
+    if cache is not None:
+        key = cache.key(resolved, data, ("strict" if strict else "plain") + ("+fail-fast" if fail_fast else ""))
+        hit = cache.get(key)
+        if hit is not None:
+            _add_time(timings["phases"], "cache", start)
+            return result(hit, cached=True)
 
-    if errors:
+    try:
+        record = parse_record(data.decode("utf-8"), resolved.suffix)
+    except Exception as e:  # JSON or YAML syntax error, bad encoding
+        return load_error(e)
+    _add_time(timings["phases"], "load", start)
+
+    outcome = validate_record(record, resolved, validator, strict, fail_fast, timings)
+    del outcome["timings"]
+    crashed = any(f["rule"] == "internal" for f in outcome["findings"])
+    if cache is not None and isinstance(record, dict) and not crashed:
+        cache.put(key, outcome["errors"], outcome["warnings"], evidence_paths(record, resolved), outcome["findings"])
+    return result(outcome)
+
+# Per-process state for pool workers: the compiled schema is built once per worker.
+_WORKER_VALIDATOR = None
+_WORKER_STRICT = False
+_WORKER_CACHE = None
+_WORKER_FAIL_FAST = False
+
+def _init_worker(schema_path: str, strict: bool, cache_dir: str | None, fail_fast: bool) -> None:
+    global _WORKER_VALIDATOR, _WORKER_STRICT, _WORKER_CACHE, _WORKER_FAIL_FAST
+    _WORKER_VALIDATOR = LazySchemaValidator(Path(schema_path))
+    _WORKER_STRICT = strict
+    _WORKER_CACHE = open_cache(Path(schema_path), Path(cache_dir) if cache_dir else None)
+    _WORKER_FAIL_FAST = fail_fast
+
+def _validate_in_worker(record_path: Path) -> dict:
+    return validate_path(record_path, _WORKER_VALIDATOR, _WORKER_STRICT, _WORKER_CACHE, _WORKER_FAIL_FAST)
+
+def validate_many(paths: list[Path], schema_path: Path, strict: bool = False, jobs: int = 1,
+                  cache_dir: Path | None = None, cache_max_bytes: int | None = None,
+                  fail_fast: bool = False):
+    """Yield one result per path, in input order, using a process pool when jobs > 1."""
+    cache = open_cache(schema_path, cache_dir, cache_max_bytes)
+    if jobs <= 1 or len(paths) < 2:
+        validator = LazySchemaValidator(schema_path)
+        for p in paths:
+            yield validate_path(p, validator, strict, cache, fail_fast)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunksize = max(1, len(paths) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(str(schema_path), strict,
+                                           str(cache_dir) if cache_dir else None, fail_fast)) as pool:
+            yield from pool.map(_validate_in_worker, paths, chunksize=chunksize)
+    if cache is not None:
+        cache.evict()
+
+def validate_stream(stream_path: Path, validator, strict: bool = False, fail_fast: bool = False):
+    """Validate each record of an audit log as it is read; yields one result per record."""
+    resolved = stream_path.resolve()
+    try:
+        records = iter_records(resolved)
+        while True:
+            start = _clock()
+            try:
+                location, record = next(records)
+            except StopIteration:
+                break
+            timings = {"phases": {}}
+            _add_time(timings["phases"], "load", start)
+            if isinstance(record, Exception):
+                outcome = {"errors": [f"<load>: {record}"], "warnings": [],
+                           "findings": [_finding("load", "<load>", f"<load>: {record}")], "timings": timings}
+            else:
+                outcome = validate_record(record, resolved, validator, strict, fail_fast, timings)
+            yield {"path": f"{stream_path}:{location}", **outcome,
+                   "seconds": time.perf_counter() - start[0], "cached": False}
+    except OSError as e:
+        yield {"path": str(stream_path), "errors": [f"<load>: {e}"], "warnings": [],
+               "findings": [_finding("load", "<load>", f"<load>: {e}")], "timings": {"phases": {}},
+               "seconds": 0.0, "cached": False}
+
+def is_stream(p: Path, force: bool = False) -> bool:
+    return force or p.suffix.lower() in STREAM_SUFFIXES
+
+def print_single(result: dict) -> int:
+    if result["errors"]:
         print("INVALID\n")
-        for e in errors:
+        for e in result["errors"]:
             print(f"- {e}")
         return 1
 
     print("VALID")
-    if warnings:
+    if result["warnings"]:
         print("\nWARNINGS")
-        for w in warnings:
+        for w in result["warnings"]:
             print(f"- {w}")
     return 0
 
+def aggregate_timings(results: list[dict]) -> dict:
+    """Sum per-phase and per-rule wall/CPU time over many results."""
+    agg = {"records": 0, "cached": 0, "phases": {}, "rules": {}}
+    for r in results:
+        agg["records"] += 1
+        agg["cached"] += bool(r.get("cached"))
+        for group in ("phases", "rules"):
+            for name, t in r.get("timings", {}).get(group, {}).items():
+                a = agg[group].setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0})
+                a["wall_ms"] += t["wall_ms"]
+                a["cpu_ms"] += t["cpu_ms"]
+    for group in ("phases", "rules"):
+        for t in agg[group].values():
+            t["wall_ms"] = round(t["wall_ms"], 4)
+            t["cpu_ms"] = round(t["cpu_ms"], 4)
+    return agg
+
+def print_timings(agg: dict) -> None:
+    print(f"\nTIMINGS ({agg['records']} records, {agg['cached']} from cache)")
+    for group in ("phases", "rules"):
+        print(f"  {group}:")
+        for name, t in sorted(agg[group].items(), key=lambda kv: -kv[1]["wall_ms"]):
+            print(f"    {name:<22} wall {t['wall_ms']:>10.3f} ms   cpu {t['cpu_ms']:>10.3f} ms")
+
+def print_json(results, with_timings: bool = False) -> int:
+    """Write results as one JSON document, one result at a time (streams stay bounded)."""
+    total = invalid = 0
+    agg_source = [] if with_timings else None
+    sys.stdout.write('{"results": [')
+    for r in results:
+        if not with_timings:
+            r = {k: v for k, v in r.items() if k != "timings"}
+        else:
+            agg_source.append({"cached": r.get("cached"), "timings": r.get("timings", {})})
+            r = {**r, "timings": {group: {name: {k: round(v, 4) for k, v in t.items()} for name, t in times.items()}
+                                  for group, times in r.get("timings", {}).items()}}
+        sys.stdout.write((",\n  " if total else "\n  ") + json.dumps(r))
+        total += 1
+        invalid += bool(r["errors"])
+    doc_tail = {"summary": {"records": total, "valid": total - invalid, "invalid": invalid}}
+    if with_timings:
+        doc_tail["timings"] = aggregate_timings(agg_source)
+    sys.stdout.write("\n], " + json.dumps(doc_tail)[1:] + "\n")
+    return 1 if invalid else 0
+
+def print_batch(results, quiet: bool = False) -> int:
+    total = invalid = 0
+    for r in results:
+        total += 1
+        if r["errors"]:
+            invalid += 1
+            print(f"{r['path']}: INVALID")
+            for e in r["errors"]:
+                print(f"  - {e}")
+        elif not quiet:
+            print(f"{r['path']}: VALID")
+            for w in r["warnings"]:
+                print(f"  ! {w}")
+    print(f"\nSummary: {total} records, {total - invalid} valid, {invalid} invalid")
+    return 1 if invalid else 0
+
+def report(results, single: bool, fmt: str = "text", quiet: bool = False, with_timings: bool = False) -> int:
+    """Print results in the requested format and return the exit code."""
+    if fmt == "json":
+        return print_json(results, with_timings)
+    if with_timings:
+        results = list(results)
+    code = print_single(results[0]) if single else print_batch(results, quiet)
+    if with_timings:
+        print_timings(aggregate_timings(results))
+    return code
+
+def main() -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(
+        prog="validate.py",
+        description="Validate AHS audit records against the schema and mechanical invariants.",
+    )
+    ap.add_argument("paths", nargs="*", help="record files, directories or glob patterns")
+    ap.add_argument("--strict", action="store_true", help="also report audit-friendliness warnings")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                    help="worker processes for multi-record runs (default: CPU count)")
+    ap.add_argument("--stream", action="store_true",
+                    help="treat every input as a multi-record log (implied for .jsonl/.ndjson)")
+    ap.add_argument("-q", "--quiet", action="store_true", help="only print INVALID records and the summary")
+    ap.add_argument("--fail-fast", action="store_true",
+                    help="stop at the first failing phase or invariant rule of each record")
+    ap.add_argument("--no-cache", action="store_true", help="ignore and do not update the result cache")
+    ap.add_argument("--cache-dir", type=Path, default=None, help="cache location (default: .ahs-cache/validate)")
+    ap.add_argument("--cache-max-mb", type=int, default=None, help="evict cache entries beyond this size")
+    ap.add_argument("--timings", action="store_true", help="report wall/CPU time per phase and invariant rule")
+    ap.add_argument("--format", choices=("text", "json"), default="text",
+                    help="json: structured findings, summary and timings on stdout")
+    ap.add_argument("--serve", action="store_true", help="run a warm validation daemon on --address")
+    ap.add_argument("--connect", action="store_true", help="validate through the daemon on --address")
+    ap.add_argument("--address", default=None,
+                    help="daemon address: unix:/path/to.sock or [host:]port (default: 127.0.0.1:8765)")
+    ap.add_argument("--schema", type=Path, default=default_schema_path(), help=argparse.SUPPRESS)
+    args = ap.parse_args([a for a in sys.argv[1:] if a.strip()])
+
+    schema_path = args.schema.resolve()
+    cache_dir = None
+    if not args.no_cache:
+        from validation_cache import DEFAULT_CACHE_DIR
+        cache_dir = (args.cache_dir or DEFAULT_CACHE_DIR).resolve()
+    cache_max_bytes = args.cache_max_mb * 1024 * 1024 if args.cache_max_mb is not None else None
+
+    if args.serve:
+        import validate_server
+        return validate_server.serve(args.address or validate_server.DEFAULT_ADDRESS, schema_path, cache_dir,
+                                     cache_max_bytes)
+    if not args.paths:
+        ap.error("the following arguments are required: paths")
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        print("No records found")
+        return 2
+
+    records = [p for p in paths if not is_stream(p, args.stream)]
+    streams = [p for p in paths if is_stream(p, args.stream)]
+    single = not streams and len(args.paths) == 1 and len(paths) == 1 and Path(args.paths[0]).is_file()
+
+    if args.connect:
+        import validate_server
+        try:
+            remote = validate_server.remote_validate(args.address or validate_server.DEFAULT_ADDRESS,
+                                                     [str(p) for p in paths], args.strict, args.fail_fast,
+                                                     args.stream)
+        except OSError as e:
+            print(f"validate.py: daemon not reachable ({e}); validating locally", file=sys.stderr)
+        except (RuntimeError, ValueError) as e:
+            print(f"validate.py: daemon request failed ({e}); validating locally", file=sys.stderr)
+        else:
+            return report(remote, single, args.format, args.quiet, args.timings)
+
+    # A single plain file keeps the original one-record output format.
+    if single:
+        return report(list(validate_many(records, schema_path, args.strict, 1, cache_dir, cache_max_bytes,
+                                         args.fail_fast)), True, args.format, args.quiet, args.timings)
+
+    def results():
+        yield from validate_many(records, schema_path, args.strict, args.jobs, cache_dir, cache_max_bytes,
+                                 args.fail_fast)
+        if streams:
+            validator = LazySchemaValidator(schema_path)
+            for p in streams:
+                yield from validate_stream(p, validator, args.strict, args.fail_fast)
+
+    return report(results(), False, args.format, args.quiet, args.timings)
+
 if __name__ == "__main__":
     raise SystemExit(main())
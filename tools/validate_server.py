@@ -0,0 +1,223 @@
+"""
+Long-running validation daemon for tools/validate.py.
+
+`validate.py --serve` keeps the imports, the compiled schema, the result
+cache and the evidence stat/hash cache warm, and answers validation
+requests over HTTP on localhost or on a Unix socket. Requests run on a
+thread per connection. `validate.py --connect` is the thin client: it
+prints the same output and returns the same exit codes as a local run.
+
+Address forms: "unix:/path/to/ahs.sock", "127.0.0.1:8765" or "8765".
+
+Endpoints:
+  POST /validate  {"cwd": str, "paths": [str], "strict": bool, "fail_fast": bool, "stream": bool}
+                  -> {"results": [result, ...]}
+  GET  /stats     -> {"requests": n, "records": n, "p50_ms": x, "p99_ms": x, "max_ms": x}
+  GET  /health    -> {"ok": true, "validator_version": str}
+"""
+from __future__ import annotations
+
+import json
+import socket
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import validate
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+EVICT_INTERVAL = 60.0  # seconds between result-cache size checks while requests keep arriving
+
+def parse_address(address: str):
+    """Return ("unix", path) or ("tcp", (host, port))."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+class LatencyStats:
+    """Request latencies over a sliding window, for p50/p99 reporting."""
+
+    def __init__(self, window: int = 10000):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.requests = 0
+        self.records = 0
+
+    def add(self, seconds: float, records: int) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.requests += 1
+            self.records += records
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+            out = {"requests": self.requests, "records": self.records}
+        if ordered:
+            def pct(q):
+                return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+            out.update(p50_ms=pct(0.50), p99_ms=pct(0.99), max_ms=round(ordered[-1] * 1000, 3))
+        return out
+
+class ValidationService:
+    """Warm state shared by all request threads."""
+
+    def __init__(self, schema_path: Path, cache_dir: Path | None, cache_max_bytes: int | None = None):
+        self.validator = validate.compile_schema(validate.load_schema(schema_path))
+        self.cache = validate.open_cache(schema_path, cache_dir, cache_max_bytes)
+        self.stats = LatencyStats()
+        self._evict_lock = threading.Lock()
+        self._evicted_at = float("-inf")
+
+    def validate(self, request: dict) -> list[dict]:
+        cwd = Path(request.get("cwd") or ".")
+        strict = bool(request.get("strict"))
+        fail_fast = bool(request.get("fail_fast"))
+        results = []
+        with validate.EVIDENCE.run_scope():  # hashes stay warm; stats are re-read per request
+            for display in request.get("paths", []):
+                p = cwd / display
+                if validate.is_stream(p, bool(request.get("stream"))):
+                    for r in validate.validate_stream(p, self.validator, strict, fail_fast):
+                        r["path"] = r["path"].replace(str(p), display, 1)
+                        results.append(r)
+                else:
+                    r = validate.validate_path(p, self.validator, strict, self.cache, fail_fast)
+                    r["path"] = display
+                    results.append(r)
+        return results
+
+    def maybe_evict(self) -> None:
+        """Trim the result cache to its size limit, at most once per EVICT_INTERVAL and one thread at a time."""
+        if self.cache is None or time.monotonic() - self._evicted_at < EVICT_INTERVAL:
+            return
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            self._evicted_at = time.monotonic()
+            self.cache.evict()
+        finally:
+            self._evict_lock.release()
+
+def make_handler(service: ValidationService):
+    from http.server import BaseHTTPRequestHandler  # server-only import keeps the client start fast
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def address_string(self):
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, fmt, *args):
+            pass  # latency stats replace per-request access logs
+
+        def _reply(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._reply(200, service.stats.snapshot())
+            elif self.path == "/health":
+                self._reply(200, {"ok": True, "validator_version": validate.validator_version()})
+            else:
+                self._reply(404, {"error": f"unknown endpoint {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/validate":
+                self._reply(404, {"error": f"unknown endpoint {self.path}"})
+                return
+            started = time.perf_counter()
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                results = service.validate(request)
+            except Exception as e:
+                self._reply(400, {"error": str(e)})
+                return
+            service.stats.add(time.perf_counter() - started, len(results))
+            self._reply(200, {"results": results})
+            service.maybe_evict()  # after the reply, so the client never waits on it
+
+    return Handler
+
+def serve(address: str, schema_path: Path, cache_dir: Path | None, cache_max_bytes: int | None = None) -> int:
+    import socketserver
+    from http.server import ThreadingHTTPServer
+
+    # Agents connect in bursts; the default listen backlog of 5 refuses them.
+    class LocalHTTPServer(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    service = ValidationService(schema_path, cache_dir, cache_max_bytes)
+    kind, target = parse_address(address)
+    handler = make_handler(service)
+    if kind == "unix":
+        sock = Path(target)
+        if sock.exists():
+            sock.unlink()  # stale socket from a previous daemon
+        server = ThreadingUnixHTTPServer(str(sock), handler)
+    else:
+        server = LocalHTTPServer(target, handler)
+    print(f"validate.py serving on {address} (validator {validate.validator_version()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if kind == "unix":
+            Path(target).unlink(missing_ok=True)
+        print(f"\nstats: {json.dumps(service.stats.snapshot())}")
+    return 0
+
+def request(address: str, method: str, path: str, payload: dict | None = None, timeout: float = 300.0) -> dict:
+    """
+    Send one request to a running daemon; raises OSError if it is not reachable,
+    RuntimeError for an error reply and ValueError for a malformed or truncated one.
+    Speaks just enough HTTP/1.1 over a raw socket to skip importing http.client,
+    which keeps the thin client's start-up close to a bare interpreter.
+    """
+    kind, target = parse_address(address)
+    family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    head = (f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode("ascii")
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        sock.sendall(head + body)
+        chunks = []
+        while True:
+            chunk = sock.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    raw_head, _, raw_body = b"".join(chunks).partition(b"\r\n\r\n")
+    try:
+        status = int(raw_head.split(b" ", 2)[1])
+        data = json.loads(raw_body)
+    except (IndexError, ValueError):
+        raise ValueError(f"malformed reply to {method} {path} ({len(raw_body)} body bytes)") from None
+    if not isinstance(data, dict):
+        raise ValueError(f"malformed reply to {method} {path}")
+    if status != 200:
+        raise RuntimeError(data.get("error", f"HTTP {status}"))
+    return data
+
+def remote_validate(address: str, paths: list[str], strict: bool, fail_fast: bool, stream: bool) -> list[dict]:
+    payload = {"cwd": str(Path.cwd()), "paths": paths, "strict": strict, "fail_fast": fail_fast, "stream": stream}
+    results = request(address, "POST", "/validate", payload).get("results")
+    if not isinstance(results, list):
+        raise ValueError("reply to POST /validate has no results list")
+    return results
@@ -0,0 +1,154 @@
+"""
+Incremental validation cache for tools/validate.py and tools/pack-runner.py.
+
+An entry is keyed on the record bytes and location (evidence refs resolve
+relative to it), the schema file hash, the validator version and the
+validation mode (strict, fail-fast). It stores the VALID/INVALID result, the error and warning lists, and a
+fingerprint (mtime, size, sha256) of every local evidence file the record
+references. A hit is only returned while those
+fingerprints still hold, so touching or replacing evidence invalidates it.
+
+Entries live as small JSON files under .ahs-cache/validate/ and are evicted
+least-recently-used first once the directory exceeds its size bound. Every
+put appends its size to a ledger file, so checking the bound reads one small
+file; the entries are only listed and stat'ed when the ledger says the bound
+is exceeded (or the ledger is missing), and that scan rewrites the ledger
+with the exact total.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[1] / ".ahs-cache" / "validate"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+LEDGER = "size-ledger"
+
+def sha256_file(p: Path) -> str:
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fingerprint(p: Path, hasher=sha256_file) -> dict:
+    """Stat + content hash of one evidence file (or a marker that it is missing)."""
+    try:
+        st = p.stat()
+    except OSError:
+        return {"path": str(p), "missing": True}
+    return {"path": str(p), "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": hasher(p)}
+
+def fingerprint_holds(fp: dict, hasher=sha256_file) -> bool:
+    p = Path(fp["path"])
+    try:
+        st = p.stat()
+    except OSError:
+        return bool(fp.get("missing"))
+    if fp.get("missing"):
+        return False
+    if st.st_mtime_ns == fp["mtime_ns"] and st.st_size == fp["size"]:
+        return True
+    # Touched but possibly identical: fall back to the content hash.
+    return st.st_size == fp["size"] and hasher(p) == fp["sha256"]
+
+class ValidationCache:
+    def __init__(self, cache_dir: Path, schema_path: Path, validator_version: str,
+                 max_bytes: int = DEFAULT_MAX_BYTES, hasher=sha256_file):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hasher = hasher  # lets the validator share its per-run evidence hash cache
+        self.prefix = f"{sha256_file(schema_path)}:{validator_version}:"
+
+    def key(self, record_path: Path, record_bytes: bytes, mode: str) -> str:
+        h = hashlib.sha256(self.prefix.encode("utf-8"))
+        h.update(f"{record_path}:{mode}:".encode("utf-8"))
+        h.update(record_bytes)
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        """Return the cached {"errors", "warnings", "findings"} for key, or None on a miss or stale evidence."""
+        entry_path = self._entry_path(key)
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not all(fingerprint_holds(fp, self.hasher) for fp in entry.get("evidence", [])):
+            return None
+        try:
+            os.utime(entry_path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return {"errors": entry["errors"], "warnings": entry["warnings"], "findings": entry.get("findings", [])}
+
+    def put(self, key: str, errors: list[str], warnings: list[str], evidence_paths: list[Path],
+            findings: list[dict] | None = None) -> None:
+        entry = {
+            "result": "INVALID" if errors else "VALID",
+            "errors": errors,
+            "warnings": warnings,
+            "findings": findings or [],
+            "evidence": [fingerprint(p, self.hasher) for p in evidence_paths],
+        }
+        entry_path = self._entry_path(key)
+        data = json.dumps(entry).encode("utf-8")
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = entry_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, entry_path)
+            # One O_APPEND write, so pool workers and concurrent runs can all add to the ledger. Only
+            # evict() creates it, after a full scan, so a missing ledger always means "scan first".
+            fd = os.open(self.cache_dir / LEDGER, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, f"{len(data)}\n".encode("ascii"))
+            finally:
+                os.close(fd)
+        except OSError:
+            pass  # the cache is an optimisation; never fail validation over it
+
+    def _ledger_bytes(self) -> int | None:
+        """Bytes written since the last scan (overwrites count twice, so this only errs high), or None."""
+        try:
+            return sum(int(n) for n in (self.cache_dir / LEDGER).read_text(encoding="ascii").split())
+        except (OSError, ValueError):
+            return None
+
+    def evict(self) -> int:
+        """Delete least-recently-used entries until the cache fits in max_bytes; returns entries removed."""
+        if not self.cache_dir.exists():
+            return 0
+        ledger = self._ledger_bytes()
+        if ledger is not None and ledger <= self.max_bytes:
+            return 0
+        entries = []
+        total = 0
+        for p in self.cache_dir.glob("*/*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, p))
+            total += st.st_size
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        try:
+            tmp = self.cache_dir / f"{LEDGER}.{os.getpid()}.tmp"
+            tmp.write_text(f"{total}\n", encoding="ascii")
+            os.replace(tmp, self.cache_dir / LEDGER)
+        except OSError:
+            pass
+        return removed
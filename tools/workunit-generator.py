@@ -7,6 +7,7 @@ Guides users through each section and validates compliance.
 """
 
 import json
+import os
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -212,6 +213,7 @@ def create_final_green() -> dict:
         evidence_ref = prompt_with_validation("Evidence reference (e.g., logs/final_green.txt)")
         
         print("\n=== Summary Metrics ===")
+        print("(tools/measure-green.py can measure these by running check_suite.run_command)")
         duration_seconds = float(prompt_with_validation("Duration in seconds", validator=lambda x: x.replace(".", "").isdigit()))
         checks_executed = int(prompt_with_validation("Checks executed", validator=lambda x: x.isdigit()))
         
@@ -327,6 +329,204 @@ def save_workunit(workunit: dict, filename: str):
         print(f"ERROR saving workunit: {e}")
         return False
 
+# --- Batch mode -------------------------------------------------------------
+# Builds WorkUnits without prompts from a spec file plus machine artifacts:
+# JUnit XML from the first-red and final-green runs, and the git diff between
+# base_ref and final_ref. See --batch in the usage text below.
+
+class SpecError(Exception):
+    """A spec entry that cannot be built as written, e.g. a bad git ref; batch mode exits 2."""
+
+def git_ref(entry: dict, key: str) -> str:
+    """
+    base_ref/final_ref, which must be a string: YAML reads an unquoted short SHA
+    such as 1155992 as an int (or 0755 as octal), so the original text is lost.
+    """
+    value = entry[key]
+    if not isinstance(value, str) or not value:
+        raise SpecError(f"{key} must be a git ref string; quote it in YAML (e.g. {key}: \"0755abc\"), got {value!r}")
+    return value
+
+def junit_report(path: Path) -> dict:
+    """Test cases and totals from a JUnit XML report (testsuite or testsuites root)."""
+    import xml.etree.ElementTree as ET
+
+    root = ET.parse(path).getroot()
+    suites = [root] if root.tag == "testsuite" else list(root.iter("testsuite"))
+    cases = []
+    for suite in suites:
+        for case in suite.iter("testcase"):
+            if case.find("failure") is not None or case.find("error") is not None:
+                outcome = "failed"
+            elif case.find("skipped") is not None:
+                outcome = "skipped"
+            else:
+                outcome = "passed"
+            cases.append({"name": case.get("name", ""), "classname": case.get("classname", ""), "outcome": outcome})
+    seconds = float(root.get("time") or sum(float(s.get("time") or 0) for s in suites))
+    stamps = [s.get("timestamp") for s in suites if s.get("timestamp")]
+    return {"cases": cases, "seconds": seconds, "timestamp": stamps[0] if stamps else None}
+
+def utc_stamp(timestamp: Optional[str], fallback: Path) -> str:
+    """ISO timestamp (JUnit's, assumed UTC when naive) or the file's mtime, as YYYY-MM-DDThh:mm:ssZ."""
+    from datetime import timezone
+
+    if timestamp:
+        try:
+            dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            dt = dt.astimezone(timezone.utc) if dt.tzinfo else dt
+            return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(fallback.stat().st_mtime, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def git_files_changed(repo: Path, base_ref: str, final_ref: str, line_counts: bool = False) -> list:
+    """files_changed entries from `git diff -z --name-status base final`, streamed by diff_set.py."""
+    import diff_set
+
+    return list(diff_set.iter_files_changed(repo, base_ref, final_ref, line_counts))
+
+def check_mapping(checks: dict, case: dict) -> Optional[dict]:
+    """The spec's `checks` entry for a test case, matched by name, classname.name or classname::name."""
+    for key in (case["name"], f"{case['classname']}.{case['name']}", f"{case['classname']}::{case['name']}"):
+        if key in checks:
+            return checks[key]
+    return None
+
+def build_workunit(entry: dict, base_dir: Path, out_dir: Path, warnings: list) -> dict:
+    """One WorkUnit from a spec entry (defaults already merged) and its artifacts."""
+    def local(key: str) -> Path:
+        return (base_dir / entry[key]).resolve()
+
+    def ref(p: Path) -> str:
+        return os.path.relpath(p, out_dir.resolve())
+
+    work_id = entry["work_id"]
+    red_junit, green_junit = local("first_red_junit"), local("final_green_junit")
+    red, green = junit_report(red_junit), junit_report(green_junit)
+    red_evidence = local("first_red_evidence") if entry.get("first_red_evidence") else red_junit
+    green_evidence = local("final_green_evidence") if entry.get("final_green_evidence") else green_junit
+
+    checks = entry.get("checks") or {}
+    failing_checks, seen = [], set()
+    failed_red = [c for c in red["cases"] if c["outcome"] == "failed"]
+    for case in failed_red:
+        # Qualified by classname, so same-named tests in different suites stay separate checks.
+        check_id = f"{case['classname']}::{case['name']}" if case["classname"] else case["name"]
+        if check_id in seen:
+            continue
+        seen.add(check_id)
+        mapping = check_mapping(checks, case)
+        if mapping is None:
+            warnings.append(f"{work_id}: failing test {check_id} is not mapped in `checks`; skipped")
+            continue
+        failing_checks.append({
+            "check_id": check_id,
+            "constraint_ids": list(mapping.get("constraints", [])),
+            "evidence_ref": ref(red_evidence),
+            "coupling": mapping.get("coupling", "direct"),
+        })
+
+    failed = sum(c["outcome"] == "failed" for c in green["cases"])
+    executed = sum(c["outcome"] != "skipped" for c in green["cases"])
+    base_ref, final_ref = git_ref(entry, "base_ref"), git_ref(entry, "final_ref")
+    files_changed = entry.get("files_changed")
+    if files_changed is None:
+        try:
+            files_changed = git_files_changed((base_dir / entry.get("repo", ".")).resolve(),
+                                              base_ref, final_ref, bool(entry.get("line_counts")))
+        except ValueError as e:
+            raise SpecError(f"{e} (base_ref {base_ref}, final_ref {final_ref})") from None
+    rationale = entry.get("rationale") or {}
+    if isinstance(rationale, dict):
+        rationale = [{"constraint_id": cid, "note": note} for cid, note in rationale.items()]
+    summary_metrics = {"duration_seconds": round(green["seconds"], 3)}
+    if executed:
+        summary_metrics["checks_executed"] = executed
+
+    return {
+        "audit_version": "1.0",
+        "work_id": work_id,
+        "timestamp_utc": entry.get("timestamp_utc") or utc_stamp(red["timestamp"], red_junit),
+        "repo_ref": entry["repo_ref"],
+        "actor": {"human": (entry.get("actor") or {}).get("human"), "agent": (entry.get("actor") or {}).get("agent")},
+        "mini_spec": {
+            "summary": entry["summary"],
+            "constraints": entry["constraints"],
+            "out_of_scope": entry.get("out_of_scope", []),
+        },
+        "check_suite": entry["check_suite"],
+        "first_red": {"occurred": bool(failed_red), "failing_checks": failing_checks},
+        "diff_set": {
+            "base_ref": base_ref,
+            "final_ref": final_ref,
+            "files_changed": files_changed,
+            "rationale": rationale,
+        },
+        "final_green": {
+            "all_checks_passed": failed == 0 and executed > 0,
+            "run_id": "run-" + utc_stamp(green["timestamp"], green_junit),
+            "evidence_ref": ref(green_evidence),
+            "summary_metrics": summary_metrics,
+        },
+        "spec_delta": entry.get("spec_delta") or {"changed": False, "changes": [], "human_decision": "n/a"},
+    }
+
+def batch_main(argv: list) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="workunit-generator.py --batch",
+                                 description="Build WorkUnits from a spec file, JUnit XML reports and git.")
+    ap.add_argument("spec", type=Path, help="YAML/JSON spec: {defaults: {...}, workunits: [{...}, ...]}")
+    ap.add_argument("--out", type=Path, default=Path("."), help="directory for <work_id>.yaml (default: .)")
+    ap.add_argument("--keep-invalid", action="store_true", help="also write records that fail validation")
+    args = ap.parse_args(argv)
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import validate
+
+    yaml, _ = validate.yaml_loader()
+    spec = validate.load_record(args.spec)
+    entries = spec.get("workunits", [spec]) if isinstance(spec, dict) else spec
+    defaults = spec.get("defaults", {}) if isinstance(spec, dict) else {}
+    validator = validate.compile_schema(validate.load_schema(validate.default_schema_path()))
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    written = invalid = bad_spec = 0
+    for entry in entries:
+        entry = {**defaults, **entry}
+        target = args.out / f"{entry.get('work_id', 'unnamed')}.yaml"
+        warnings = []
+        try:
+            workunit = build_workunit(entry, args.spec.resolve().parent, args.out, warnings)
+        except SpecError as e:
+            print(f"ERROR  {target}: {e}")
+            bad_spec += 1
+            continue
+        except (KeyError, OSError, ValueError) as e:
+            detail = f"missing spec field {e}" if isinstance(e, KeyError) else str(e)
+            print(f"ERROR  {target}: {detail}")
+            invalid += 1
+            continue
+        outcome = validate.validate_record(workunit, target.resolve(), validator)
+        for w in warnings:
+            print(f"WARNING: {w}")
+        if outcome["errors"]:
+            invalid += 1
+            print(f"INVALID {target}")
+            for err in outcome["errors"]:
+                print(f"  - {err}")
+            if not args.keep_invalid:
+                continue
+        else:
+            print(f"VALID  {target}")
+        target.write_text(yaml.safe_dump(workunit, sort_keys=False), encoding="utf-8")
+        written += 1
+
+    print(f"\nSummary: {len(entries)} spec entries, {written} written, {invalid} invalid, "
+          f"{bad_spec} unusable")
+    return 2 if bad_spec else 1 if invalid else 0
+
 def main():
     print("=== WorkUnit Generator Scaffold ===")
     print("This tool will guide you through creating a valid WorkUnit.")
@@ -374,6 +574,15 @@ if __name__ == "__main__":
         print("Guides through each section with validation feedback.")
         print()
         print("Usage: python tools/workunit-generator.py")
+        print("       python tools/workunit-generator.py --batch spec.yaml [--out DIR] [--keep-invalid]")
+        print()
+        print("Batch mode builds one WorkUnit per spec entry without prompts: failing_checks")
+        print("from the first-red JUnit XML, summary_metrics from the final-green JUnit XML,")
+        print("files_changed from git diff --name-status base_ref final_ref. Each record is")
+        print("validated in-process before it is written. Exits 1 if any record is invalid,")
+        print("2 if a spec entry is unusable (e.g. a git ref that does not resolve).")
         sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        sys.exit(batch_main(sys.argv[2:]))
     
     sys.exit(main())